@@ -1,10 +1,21 @@
 # ast/nodes.py
 # Catapillar AST node definitions.
-# Most AST nodes are plain dicts (see parser/parser.py for structure).
-# This module contains class-based nodes for Arrow and documents
-# all dict-based node types used across the system.
+# The parser builds slotted node classes from parser/nodes.py (a top-level
+# `ast` package would shadow the stdlib module, so they cannot live here).
+# Each node reads like the dict shape documented below and converts to it
+# with node.to_dict(); parser.nodes.from_dict() converts back.
 
-# ---- Dict-based expression node types (M1) ----
+# ---- Structure node types ----
+#
+# {"type": "Program",   "flows": [Flow, ...]}
+# {"type": "Flow",      "segments": [Segment, ...]}
+# {"type": "Segment",   "lines": [Line | Block | BLOCK_END | Arrow, ...]}
+# {"type": "Line",      "action": "PRINT", "line_state": "~", "args": [...], ...}
+# {"type": "Block",     "name": "name", "lines": [], "line_state": "~"}
+# {"type": "BLOCK_END", "line_state": "~"}
+# {"type": "Arrow",     "from": "a", "to": "b", "direction": "->", "line_state": "~"}
+
+# ---- Expression node types (M1) ----
 #
 # {"type": "NumberLiteral",  "value": "42"}
 # {"type": "BoolLiteral",   "value": True/False}
@@ -18,9 +29,3 @@
 # {"type": "IndexAccess",   "container": expr, "index": expr}
 # {"type": "CallExpr",      "func": "name", "args": [expr, ...]}
 
-
-class Arrow:
-    def __init__(self, from_, to_, state=None):
-        self.from_ = from_
-        self.to_ = to_
-        self.state = state
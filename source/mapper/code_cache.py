@@ -0,0 +1,79 @@
+# mapper/code_cache.py
+# On-disk cache for `--exec` runs, similar to __pycache__.
+# Stores the generated Python, its marshalled code object and the parse warnings
+# next to the .cat file, keyed by the source content hash, the mapper version and
+# the lexicon hash, so unchanged scripts skip tokenize → parse → map → compile
+# entirely (the warnings are replayed instead).
+# Like __pycache__, nothing is written while PYTHONDONTWRITEBYTECODE is set.
+
+import hashlib
+import importlib.util
+import marshal
+import os
+import sys
+from types import CodeType
+from typing import Iterable, List, Optional, Tuple
+
+from mapper.python_mapper import MAPPER_VERSION
+
+CACHE_DIR = "__catcache__"
+CACHE_SUFFIX = ".catc"
+_FORMAT = 2
+
+
+def cache_path(path: str) -> str:
+    """examples/foo.cat → examples/__catcache__/foo.cat.catc"""
+    head, tail = os.path.split(os.path.abspath(path))
+    return os.path.join(head, CACHE_DIR, tail + CACHE_SUFFIX)
+
+
+def source_key(source: bytes, mode: str, lexicon_paths: Iterable[str] = ()) -> str:
+    """
+    Cache key for one .cat source. Changes whenever the source, the requested
+    mode, the mapper version, the interpreter's bytecode format or any of the
+    lexicon files change.
+    """
+    h = hashlib.sha256()
+    h.update(f"{_FORMAT}|{MAPPER_VERSION}|{mode}|".encode("utf-8"))
+    h.update(importlib.util.MAGIC_NUMBER)
+    h.update(hashlib.sha256(source).digest())
+    for lex_path in lexicon_paths:
+        h.update(lex_path.encode("utf-8"))
+        try:
+            with open(lex_path, "rb") as f:
+                h.update(hashlib.sha256(f.read()).digest())
+        except OSError:
+            h.update(b"<missing>")
+    return h.hexdigest()
+
+
+def load(path: str, key: str) -> Optional[Tuple[str, CodeType, List[str]]]:
+    """Return (py_code, code, parse warnings) cached for `path` under `key`, or None on a miss."""
+    try:
+        with open(cache_path(path), "rb") as f:
+            entry = marshal.load(f)
+        fmt, cached_key = entry[:2]
+        if fmt != _FORMAT or cached_key != key:
+            return None
+        _, _, py_code, code, parse_warnings = entry
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    return py_code, code, list(parse_warnings)
+
+
+def store(path: str, key: str, py_code: str, code: CodeType, parse_warnings: Iterable[str] = ()) -> None:
+    """Write the cache entry for `path`; failures are ignored (the cache is optional)."""
+    if sys.dont_write_bytecode:
+        return
+    target = cache_path(path)
+    tmp = f"{target}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(tmp, "wb") as f:
+            marshal.dump((_FORMAT, key, py_code, code, tuple(parse_warnings)), f)
+        os.replace(tmp, target)
+    except OSError:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
@@ -1,7 +1,9 @@
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 from runtime.lexicon_loader import resolve_intent
+from runtime.transitions import BRANCH_CONDITIONS, GUARDS, TransitionTable
 
-def map_program_to_flow(program: Dict) -> List[str]:
+def map_program_to_flow(program: Dict, lexicon=None) -> List[str]:
+    """Flatten Arrow lines into intent ids; `lexicon` (e.g. a LexiconSnapshot) defaults to the global one."""
     flow = []
 
     for flow_obj in program.get("flows", []):
@@ -11,8 +13,8 @@ def map_program_to_flow(program: Dict) -> List[str]:
                     from_word = line["from"]
                     to_word = line["to"]
 
-                    from_intent = resolve_intent(from_word)
-                    to_intent = resolve_intent(to_word)
+                    from_intent = resolve_intent(from_word, lexicon)
+                    to_intent = resolve_intent(to_word, lexicon)
 
                     if from_intent:
                         flow.append(from_intent)
@@ -20,3 +22,173 @@ def map_program_to_flow(program: Dict) -> List[str]:
                         flow.append(to_intent)
 
     return flow
+
+
+class FlowGraph:
+    """
+    Indexed flow graph compiled from the Arrow lines of a program.
+
+    Nodes are the words used in arrows (labels[i]) with their resolved
+    intent (intents[i], None if the lexicon has no alias for it); words
+    inside a Block are separate nodes from the same words outside it
+    (scopes[i] is the block name or None). Edges are
+    parallel arrays (edge_src / edge_dst / edge_cond / edge_block) and
+    succ[i] lists the edge ids leaving node i, in source order. edge_cond is
+    "ok" / "not_ok" for `!` / `?` lines and None for plain edges; edge_block
+    names the Block the edge was written in. blocks maps each block name to
+    (entry node, edge ids); an arrow pointing at a block name leads to that
+    block's entry node. Duplicate edges are kept once.
+    """
+
+    __slots__ = (
+        "labels", "intents", "scopes", "index", "entry", "succ",
+        "edge_src", "edge_dst", "edge_cond", "edge_block", "blocks",
+    )
+
+    def __init__(self):
+        self.labels: List[str] = []
+        self.intents: List[Optional[str]] = []
+        self.scopes: List[Optional[str]] = []
+        self.index: Dict[Tuple[Optional[str], str], int] = {}
+        self.entry: Optional[int] = None
+        self.succ: List[List[int]] = []
+        self.edge_src: List[int] = []
+        self.edge_dst: List[int] = []
+        self.edge_cond: List[Optional[str]] = []
+        self.edge_block: List[Optional[str]] = []
+        self.blocks: Dict[str, Tuple[Optional[int], List[int]]] = {}
+
+    def node(self, label: str, intent: Optional[str], scope: Optional[str] = None) -> int:
+        node_id = self.index.get((scope, label))
+        if node_id is None:
+            node_id = len(self.labels)
+            self.index[(scope, label)] = node_id
+            self.labels.append(label)
+            self.intents.append(intent)
+            self.scopes.append(scope)
+            self.succ.append([])
+        return node_id
+
+    def add_edge(self, src: int, dst: int, cond: Optional[str], block: Optional[str]) -> int:
+        for edge_id in self.succ[src]:
+            if self.edge_dst[edge_id] == dst and self.edge_cond[edge_id] == cond:
+                return edge_id
+        edge_id = len(self.edge_src)
+        self.edge_src.append(src)
+        self.edge_dst.append(dst)
+        self.edge_cond.append(cond)
+        self.edge_block.append(block)
+        self.succ[src].append(edge_id)
+        return edge_id
+
+    def successors(self, node_id: int) -> List[int]:
+        return [self.edge_dst[edge_id] for edge_id in self.succ[node_id]]
+
+    def reachable(self, start: Optional[int] = None) -> List[int]:
+        """Node ids reachable from `start` (default: entry), in BFS order."""
+        start = self.entry if start is None else start
+        if start is None:
+            return []
+        seen = {start}
+        order = [start]
+        for node_id in order:
+            for nxt in self.successors(node_id):
+                if nxt not in seen:
+                    seen.add(nxt)
+                    order.append(nxt)
+        return order
+
+    def to_transitions(self) -> TransitionTable:
+        """
+        Intent-level TransitionTable for run_flow. Edges touching a node with
+        no intent are skipped; conditional edges become guards, the first
+        plain edge out of an intent is its default. An entry node with no
+        intent hands the entry to the first resolved node reachable from it
+        (else the first resolved node at all).
+        """
+        table = TransitionTable()
+        intents = self.intents
+        for src, dst, cond in zip(self.edge_src, self.edge_dst, self.edge_cond):
+            if intents[src] and intents[dst]:
+                table.add(intents[src], intents[dst], GUARDS[cond] if cond else None)
+        if self.entry is not None:
+            order = self.reachable() + list(range(len(intents)))
+            table.entry = next((intents[node_id] for node_id in order if intents[node_id]), None)
+        return table
+
+    def to_dict(self) -> Dict:
+        return {
+            "nodes": [
+                {"label": l, "intent": i, "block": b}
+                for l, i, b in zip(self.labels, self.intents, self.scopes)
+            ],
+            "entry": self.entry,
+            "edges": [
+                {"from": s, "to": d, "condition": c, "block": b}
+                for s, d, c, b in zip(self.edge_src, self.edge_dst, self.edge_cond, self.edge_block)
+            ],
+            "blocks": {name: {"entry": entry, "edges": edges} for name, (entry, edges) in self.blocks.items()},
+        }
+
+    def __repr__(self) -> str:
+        return f"FlowGraph(nodes={len(self.labels)}, edges={len(self.edge_src)}, entry={self.entry!r})"
+
+
+def map_program_to_graph(program: Dict, lexicon=None) -> FlowGraph:
+    """Build the FlowGraph of a program (see FlowGraph); `lexicon` as in map_program_to_flow."""
+    graph = FlowGraph()
+    arrows = []  # (from, to, cond, block)
+    block = None
+
+    for flow_obj in program.get("flows", []):
+        for segment in flow_obj.get("segments", []):
+            for line in segment.get("lines", []):
+                line_type = line.get("type")
+                if line_type == "Block":
+                    block = line["name"]
+                    graph.blocks[block] = (None, [])
+                elif line_type == "BLOCK_END":
+                    block = None
+                elif line_type == "Arrow":
+                    cond = BRANCH_CONDITIONS.get(line.get("line_state"))
+                    arrows.append((line["from"], line["to"], cond, block))
+
+    resolved = {}
+
+    def node(label, scope):
+        if label not in resolved:
+            resolved[label] = resolve_intent(label, lexicon)
+        return graph.node(label, resolved[label], scope)
+
+    # A block's entry is the source of its first arrow
+    block_entry = {}
+    for from_word, _, _, in_block in arrows:
+        if in_block is not None:
+            block_entry.setdefault(in_block, from_word)
+
+    for from_word, to_word, cond, in_block in arrows:
+        src = node(from_word, in_block)
+        if to_word in block_entry:
+            dst = node(block_entry[to_word], to_word)
+        else:
+            dst = node(to_word, in_block)
+        edge_id = graph.add_edge(src, dst, cond, in_block)
+        if in_block is not None:
+            entry, edges = graph.blocks[in_block]
+            graph.blocks[in_block] = (src if entry is None else entry, edges)
+            edges.append(edge_id)
+        elif graph.entry is None:
+            graph.entry = src
+
+    if graph.entry is None and graph.labels:
+        graph.entry = 0
+    return graph
+
+
+def map_program_to_transitions(program: Dict, lexicon=None) -> TransitionTable:
+    """
+    Compile the Arrow edges into a TransitionTable for run_flow.
+    `!` / `?` edges become guarded branches (see runtime.transitions.ctx_ok);
+    the first plain edge out of an intent is its default.
+    """
+    return map_program_to_graph(program, lexicon).to_transitions()
@@ -2,13 +2,41 @@
 # Catapillar v0.2 Python mapper
 # Responsibility: AST -> Python source code with proper indentation and control flow
 
-from typing import Dict, List, Tuple
+from collections.abc import Mapping
+from typing import Any, Callable, Dict, Iterator, List, Optional, TextIO, Tuple, Union
+
+from parser.nodes import Node, from_dict
+
+
+# Bump whenever generated code changes for the same AST (invalidates --exec caches).
+MAPPER_VERSION = "0.2.1"
 
 
 class MapError(Exception):
     pass
 
 
+# Dispatch tables: expression node type -> mapper, Line action ID -> mapper.
+# Register new entries with @expr_mapper / @line_mapper (e.g. for new node types).
+EXPR_MAPPERS: Dict[str, Callable[[Node], str]] = {}
+LINE_MAPPERS: Dict[str, Callable[[Node, "IndentContext"], List[str]]] = {}
+
+
+def expr_mapper(node_type: str):
+    def deco(fn):
+        EXPR_MAPPERS[node_type] = fn
+        return fn
+    return deco
+
+
+def line_mapper(*action_ids: str):
+    def deco(fn):
+        for action_id in action_ids:
+            LINE_MAPPERS[action_id] = fn
+        return fn
+    return deco
+
+
 # Known no-arg functions — when used alone as SET value, call with ()
 _KNOWN_CALL_FUNCTIONS = {"读数", "读运算符", "input", "float", "int", "str"}
 
@@ -35,115 +63,170 @@ class IndentContext:
 # Expression → Python Code
 # ============================================================
 
-def map_expr(expr: Dict) -> str:
-    """Convert an expression AST node to Python source."""
+def _as_node(data: Union[Node, Dict]) -> Any:
+    """Node objects pass through; plain-dict ASTs (Node.to_dict form) are rebuilt."""
+    return data if isinstance(data, Node) else from_dict(data)
+
+
+def _type_of(data: Any) -> Optional[str]:
+    """The `type` of a node or of a leftover plain dict (unknown types stay dicts)."""
+    if isinstance(data, Mapping):
+        return data.get("type")
+    return type(data).__name__
+
+
+def map_expr(expr: Union[Node, Dict, None]) -> str:
+    """Convert an expression AST node (node object or plain dict) to Python source."""
     if expr is None:
         return "None"
+    return _map_expr(_as_node(expr))
 
-    t = expr.get("type")
 
-    if t == "NumberLiteral":
-        return expr["value"]
+def _map_expr(expr: Optional[Node]) -> str:
+    if expr is None:
+        return "None"
+    if not isinstance(expr, Node):
+        raise MapError(f"Unknown expression type: {_type_of(expr)}")
+    fn = EXPR_MAPPERS.get(expr.type)
+    if fn is None:
+        raise MapError(f"Unknown expression type: {expr.type}")
+    return fn(expr)
 
-    if t == "BoolLiteral":
-        return "True" if expr["value"] else "False"
 
-    if t == "NoneLiteral":
-        return "None"
+@expr_mapper("NumberLiteral")
+def _map_number(expr: Node) -> str:
+    return expr.value
+
+
+@expr_mapper("BoolLiteral")
+def _map_bool(expr: Node) -> str:
+    return "True" if expr.value else "False"
+
+
+@expr_mapper("NoneLiteral")
+def _map_none(expr: Node) -> str:
+    return "None"
+
+
+@expr_mapper("Identifier")
+def _map_identifier(expr: Node) -> str:
+    return expr.name
+
+
+@expr_mapper("StringLiteral")
+def _map_string(expr: Node) -> str:
+    escaped = expr.value.replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{escaped}"'
+
+
+@expr_mapper("BinaryExpr")
+def _map_binary(expr: Node) -> str:
+    return f"({_map_expr(expr.left)} {expr.op} {_map_expr(expr.right)})"
+
 
-    if t == "Identifier":
-        return expr["name"]
-
-    if t == "StringLiteral":
-        value = expr["value"]
-        escaped = value.replace("\\", "\\\\").replace('"', '\\"')
-        return f'"{escaped}"'
-
-    if t == "BinaryExpr":
-        left = map_expr(expr["left"])
-        right = map_expr(expr["right"])
-        return f"({left} {expr['op']} {right})"
-
-    if t == "UnaryExpr":
-        operand = map_expr(expr["operand"])
-        op = expr["op"]
-        if op == "not":
-            return f"(not {operand})"
-        return f"({op}{operand})"
-
-    if t == "ListLiteral":
-        elements = [map_expr(e) for e in expr["elements"]]
-        return f"[{', '.join(elements)}]"
-
-    if t == "DictLiteral":
-        entries = []
-        for e in expr["entries"]:
-            key = e["key"]
-            if key.get("type") == "Identifier":
-                key_str = f'"{key["name"]}"'
-            else:
-                key_str = map_expr(key)
-            entries.append(f"{key_str}: {map_expr(e['value'])}")
-        return "{" + ", ".join(entries) + "}"
-
-    if t == "IndexAccess":
-        container = map_expr(expr["container"])
-        index = map_expr(expr["index"])
-        return f"{container}[{index}]"
-
-    if t == "CallExpr":
-        func = expr["func"]
-        args = [map_expr(a) for a in expr.get("args", [])]
-        return f"{func}({', '.join(args)})"
-
-    raise MapError(f"Unknown expression type: {t}")
+@expr_mapper("UnaryExpr")
+def _map_unary(expr: Node) -> str:
+    operand = _map_expr(expr.operand)
+    op = expr.op
+    if op == "not":
+        return f"(not {operand})"
+    return f"({op}{operand})"
+
+
+@expr_mapper("ListLiteral")
+def _map_list(expr: Node) -> str:
+    return f"[{', '.join([_map_expr(e) for e in expr.elements])}]"
+
+
+@expr_mapper("DictLiteral")
+def _map_dict(expr: Node) -> str:
+    entries = []
+    for e in expr.entries:
+        key = e.key
+        if _type_of(key) == "Identifier":
+            key_str = f'"{key.name}"'
+        else:
+            key_str = _map_expr(key)
+        entries.append(f"{key_str}: {_map_expr(e.value)}")
+    return "{" + ", ".join(entries) + "}"
+
+
+@expr_mapper("IndexAccess")
+def _map_index_access(expr: Node) -> str:
+    return f"{_map_expr(expr.container)}[{_map_expr(expr.index)}]"
+
+
+@expr_mapper("CallExpr")
+def _map_call_expr(expr: Node) -> str:
+    return f"{expr.func}({', '.join([_map_expr(a) for a in expr.get('args', [])])})"
 
 
 # ============================================================
 # Program / Flow / Segment
 # ============================================================
 
-def map_program(program: Dict) -> str:
-    if program.get("type") != "Program":
+def map_program(program: Union[Node, Dict]) -> str:
+    return "\n".join(iter_program_lines(program))
+
+
+def map_program_to(program: Union[Node, Dict], stream: TextIO) -> None:
+    """
+    Write the generated Python for `program` to a text stream (file, stdout,
+    io.StringIO, ...) as it is produced, one newline-terminated line at a time.
+    """
+    write = stream.write
+    for line in iter_program_lines(program):
+        write(line)
+        write("\n")
+
+
+def iter_program_lines(program: Union[Node, Dict]) -> Iterator[str]:
+    """Yield generated Python source lines for `program` without collecting them."""
+    program = _as_node(program)
+    if _type_of(program) != "Program":
         raise MapError("Root node must be Program")
 
     ctx = IndentContext()
-    lines: List[str] = []
+    for flow in program.flows:
+        yield from _iter_flow(flow, ctx)
+
 
-    for flow in program.get("flows", []):
-        lines.extend(map_flow(flow, ctx))
+def map_flow(flow: Union[Node, Dict], ctx: IndentContext) -> List[str]:
+    return list(_iter_flow(_as_node(flow), ctx))
 
-    return "\n".join(lines)
 
+def map_segment(segment: Union[Node, Dict], ctx: IndentContext) -> List[str]:
+    return list(_iter_segment(_as_node(segment), ctx))
 
-def map_flow(flow: Dict, ctx: IndentContext) -> List[str]:
-    if flow.get("type") != "Flow":
+
+def _iter_flow(flow: Node, ctx: IndentContext) -> Iterator[str]:
+    if _type_of(flow) != "Flow":
         raise MapError("Expected Flow node")
 
-    lines: List[str] = []
-    for segment in flow.get("segments", []):
-        lines.extend(map_segment(segment, ctx))
-    return lines
+    for segment in flow.segments:
+        yield from _iter_segment(segment, ctx)
 
 
-def map_segment(segment: Dict, ctx: IndentContext) -> List[str]:
-    if segment.get("type") != "Segment":
+def _iter_segment(segment: Node, ctx: IndentContext) -> Iterator[str]:
+    if _type_of(segment) != "Segment":
         raise MapError("Expected Segment node")
 
-    lines: List[str] = []
-    for line in segment.get("lines", []):
-        result = map_statement(line, ctx)
+    for line in segment.lines:
+        result = _map_statement(line, ctx)
         if result:
-            lines.extend(result)
-    return lines
+            yield from result
 
 
 # ============================================================
 # Statement Dispatch
 # ============================================================
 
-def map_statement(stmt: Dict, ctx: IndentContext) -> List[str]:
-    stmt_type = stmt.get("type")
+def map_statement(stmt: Union[Node, Dict], ctx: IndentContext) -> List[str]:
+    return _map_statement(_as_node(stmt), ctx)
+
+
+def _map_statement(stmt: Node, ctx: IndentContext) -> List[str]:
+    stmt_type = _type_of(stmt)
 
     if stmt_type == "Line":
         result = _map_line_with_block_end_tracking(stmt, ctx)
@@ -162,75 +245,31 @@ def map_statement(stmt: Dict, ctx: IndentContext) -> List[str]:
         raise MapError(f"Unknown statement type: {stmt_type}")
 
 
-def _map_line_with_block_end_tracking(line: Dict, ctx: IndentContext) -> List[str]:
+def _map_line_with_block_end_tracking(line: Node, ctx: IndentContext) -> List[str]:
     """Dedent once before ELIF/ELSE/EXCEPT/FINALLY when no 终 preceded them."""
-    action = line.get("action")
+    action = line.action
     if action in ("ELIF", "ELSE", "EXCEPT", "FINALLY") and not ctx.last_was_block_end:
         ctx.dedent()
     return _map_line(line, ctx)
 
 
-def _map_line(line: Dict, ctx: IndentContext) -> List[str]:
+def _map_line(line: Node, ctx: IndentContext) -> List[str]:
     """Map Line node to Python code."""
-    if line.get("type") != "Line":
+    if line.type != "Line":
         raise MapError("Expected Line node")
 
-    action = line.get("action")
-    indent = ctx.get_indent()
-
-    # Control flow blocks
-    if action == "DEF":
-        return _map_def(line, ctx)
-    elif action == "IF":
-        return _map_if(line, ctx)
-    elif action == "ELIF":
-        return _map_elif(line, ctx)
-    elif action == "ELSE":
-        return _map_else(line, ctx)
-    elif action == "WHILE":
-        return _map_while(line, ctx)
-    elif action == "FOR":
-        return _map_for(line, ctx)
-    elif action == "TRY":
-        return _map_try(line, ctx)
-    elif action == "EXCEPT":
-        return _map_except(line, ctx)
-    elif action == "FINALLY":
-        return _map_finally(line, ctx)
-
-    # Simple statements
-    elif action == "RETURN":
-        return _map_return(line, ctx)
-    elif action == "BREAK":
-        return [indent + "break"]
-    elif action == "CONTINUE":
-        return [indent + "continue"]
-    elif action == "PASS":
-        return [indent + "pass"]
-    elif action == "PRINT":
-        return _map_print(line, ctx)
-    elif action == "SET":
-        return _map_set(line, ctx)
-    elif action == "INDEX_SET":
-        return _map_index_set(line, ctx)
-    elif action == "CALL":
-        return _map_call(line, ctx)
-    elif action == "GLOBAL":
-        return _map_global(line, ctx)
-
-    # Legacy standalone arithmetic
-    elif action in ("ADD", "SUB", "MUL", "DIV"):
-        op_map = {"ADD": "+", "SUB": "-", "MUL": "*", "DIV": "/"}
-        return [indent + _legacy_map_arithmetic(line.get("args", []), op_map[action])]
-
-    raise MapError(f"Unhandled ActionID: {action}")
+    fn = LINE_MAPPERS.get(line.action)
+    if fn is None:
+        raise MapError(f"Unhandled ActionID: {line.action}")
+    return fn(line, ctx)
 
 
 # ============================================================
 # Control Flow Mappers
 # ============================================================
 
-def _map_def(line: Dict, ctx: IndentContext) -> List[str]:
+@line_mapper("DEF")
+def _map_def(line: Node, ctx: IndentContext) -> List[str]:
     args = line.get("args", [])
     if not args:
         raise MapError("DEF expects at least a function name")
@@ -248,57 +287,66 @@ def _map_def(line: Dict, ctx: IndentContext) -> List[str]:
     return [indent + f"def {func_name}({param_str}):"]
 
 
-def _map_if(line: Dict, ctx: IndentContext) -> List[str]:
+@line_mapper("IF")
+def _map_if(line: Node, ctx: IndentContext) -> List[str]:
     indent = ctx.get_indent()
-    condition = map_expr(line["condition"])
+    condition = _map_expr(line.condition)
     ctx.indent()
     return [indent + f"if {condition}:"]
 
 
-def _map_elif(line: Dict, ctx: IndentContext) -> List[str]:
+@line_mapper("ELIF")
+def _map_elif(line: Node, ctx: IndentContext) -> List[str]:
     indent = ctx.get_indent()
-    condition = map_expr(line["condition"])
+    condition = _map_expr(line.condition)
     ctx.indent()
     return [indent + f"elif {condition}:"]
 
 
-def _map_else(line: Dict, ctx: IndentContext) -> List[str]:
+@line_mapper("ELSE")
+def _map_else(line: Node, ctx: IndentContext) -> List[str]:
     indent = ctx.get_indent()
     ctx.indent()
     return [indent + "else:"]
 
 
-def _map_while(line: Dict, ctx: IndentContext) -> List[str]:
+@line_mapper("WHILE")
+def _map_while(line: Node, ctx: IndentContext) -> List[str]:
     indent = ctx.get_indent()
-    condition = map_expr(line["condition"])
+    condition = _map_expr(line.condition)
     ctx.indent()
     return [indent + f"while {condition}:"]
 
 
-def _map_for(line: Dict, ctx: IndentContext) -> List[str]:
+@line_mapper("FOR")
+def _map_for(line: Node, ctx: IndentContext) -> List[str]:
     indent = ctx.get_indent()
-    var = line["var"]
-    iterable = map_expr(line["iterable"])
+    var = line.var
+    iterable = _map_expr(line.iterable)
     ctx.indent()
     return [indent + f"for {var} in {iterable}:"]
 
 
-def _map_try(line: Dict, ctx: IndentContext) -> List[str]:
+@line_mapper("TRY")
+def _map_try(line: Node, ctx: IndentContext) -> List[str]:
     indent = ctx.get_indent()
     ctx.indent()
     return [indent + "try:"]
 
 
-def _map_except(line: Dict, ctx: IndentContext) -> List[str]:
+_EXCEPTION_MAP = {
+    "零除错误": "ZeroDivisionError",
+    "其他错误": "Exception",
+}
+
+
+@line_mapper("EXCEPT")
+def _map_except(line: Node, ctx: IndentContext) -> List[str]:
     indent = ctx.get_indent()
     args = line.get("args", [])
     if args:
         exception = args[0].rstrip(":")
-        exception_map = {
-            "零除错误": "ZeroDivisionError",
-            "其他错误": "Exception",
-        }
-        py_exception = exception_map.get(exception, exception)
+        py_exception = _EXCEPTION_MAP.get(exception, exception)
         ctx.indent()
         return [indent + f"except {py_exception}:"]
     else:
@@ -306,7 +354,8 @@ def _map_except(line: Dict, ctx: IndentContext) -> List[str]:
         return [indent + "except:"]
 
 
-def _map_finally(line: Dict, ctx: IndentContext) -> List[str]:
+@line_mapper("FINALLY")
+def _map_finally(line: Node, ctx: IndentContext) -> List[str]:
     indent = ctx.get_indent()
     ctx.indent()
     return [indent + "finally:"]
@@ -316,60 +365,79 @@ def _map_finally(line: Dict, ctx: IndentContext) -> List[str]:
 # Simple Statement Mappers
 # ============================================================
 
-def _map_return(line: Dict, ctx: IndentContext) -> List[str]:
+@line_mapper("RETURN")
+def _map_return(line: Node, ctx: IndentContext) -> List[str]:
     indent = ctx.get_indent()
     value = line.get("value")
     if value is None:
         return [indent + "return"]
-    return [indent + f"return {map_expr(value)}"]
+    return [indent + f"return {_map_expr(value)}"]
 
 
-def _map_print(line: Dict, ctx: IndentContext) -> List[str]:
+@line_mapper("PRINT")
+def _map_print(line: Node, ctx: IndentContext) -> List[str]:
     indent = ctx.get_indent()
     value_expr = line.get("value")
     if value_expr is None:
         return [indent + "print()"]
-    return [indent + f"print({map_expr(value_expr)})"]
+    return [indent + f"print({_map_expr(value_expr)})"]
 
 
-def _map_set(line: Dict, ctx: IndentContext) -> List[str]:
+@line_mapper("SET")
+def _map_set(line: Node, ctx: IndentContext) -> List[str]:
     indent = ctx.get_indent()
-    name = line["name"]
-    value_expr = line["value"]
+    name = line.name
+    value_expr = line.value
 
     # Known no-arg functions: input, float, etc. used alone → call with ()
-    if value_expr.get("type") == "Identifier" and value_expr["name"] in _KNOWN_CALL_FUNCTIONS:
-        return [indent + f"{name} = {value_expr['name']}()"]
+    if _type_of(value_expr) == "Identifier" and value_expr.name in _KNOWN_CALL_FUNCTIONS:
+        return [indent + f"{name} = {value_expr.name}()"]
 
-    return [indent + f"{name} = {map_expr(value_expr)}"]
+    return [indent + f"{name} = {_map_expr(value_expr)}"]
 
 
-def _map_index_set(line: Dict, ctx: IndentContext) -> List[str]:
+@line_mapper("INDEX_SET")
+def _map_index_set(line: Node, ctx: IndentContext) -> List[str]:
     indent = ctx.get_indent()
-    container = line["container"]
-    index = map_expr(line["index"])
-    value = map_expr(line["value"])
+    container = line.container
+    index = _map_expr(line.index)
+    value = _map_expr(line.value)
     # Use helper so we raise a clear error if container is a str (parser fallback bug)
     return [indent + f"_catapillar_index_set({container!r}, {container}, {index}, {value})"]
 
 
-def _map_call(line: Dict, ctx: IndentContext) -> List[str]:
+@line_mapper("CALL")
+def _map_call(line: Node, ctx: IndentContext) -> List[str]:
     indent = ctx.get_indent()
-    func = line["func"]
-    call_args = [map_expr(a) for a in line.get("call_args", [])]
+    func = line.func
+    call_args = [_map_expr(a) for a in line.get("call_args", [])]
     return [indent + f"{func}({', '.join(call_args)})"]
 
 
-def _map_global(line: Dict, ctx: IndentContext) -> List[str]:
+@line_mapper("GLOBAL")
+def _map_global(line: Node, ctx: IndentContext) -> List[str]:
     indent = ctx.get_indent()
     names = ", ".join(line.get("names", []))
     return [indent + f"global {names}"]
 
 
+@line_mapper("BREAK", "CONTINUE", "PASS")
+def _map_keyword(line: Node, ctx: IndentContext) -> List[str]:
+    return [ctx.get_indent() + line.action.lower()]
+
+
 # ============================================================
 # Legacy Arithmetic (standalone 加/减/乘/除 actions)
 # ============================================================
 
+_LEGACY_OPS = {"ADD": "+", "SUB": "-", "MUL": "*", "DIV": "/"}
+
+
+@line_mapper("ADD", "SUB", "MUL", "DIV")
+def _map_legacy_arithmetic(line: Node, ctx: IndentContext) -> List[str]:
+    return [ctx.get_indent() + _legacy_map_arithmetic(line.get("args", []), _LEGACY_OPS[line.action])]
+
+
 def _legacy_map_arithmetic(args: List[str], operator: str) -> str:
     if len(args) != 3:
         raise MapError(f"Arithmetic operation expects 3 arguments: result left right")
@@ -0,0 +1,119 @@
+# parser/ast_cache.py
+# Opt-in cache of parsed ASTs for parse_file.
+# Memory LRU keyed by path, plus an optional disk store keyed by content hash.
+
+import hashlib
+import io
+import marshal
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from parser.nodes import Program, from_dict
+from parser.parser import parse_tokens
+from parser.tokenizer import iter_tokens
+
+# Bump when node classes or parser output change (invalidates disk entries).
+AST_FORMAT = 2
+
+
+class AstCache:
+    """
+    Parsed-AST cache.
+
+    A memory hit needs only a stat(): entries are reused while the file's
+    mtime and size are unchanged. When the stat changes, the content hash
+    decides: identical content (e.g. a touched file) is a hit, anything
+    else is re-parsed. With `disk_dir`, parsed ASTs are also marshalled there
+    in their plain-dict form (Node.to_dict) under their content hash, so
+    other processes can reuse them; loading one never runs code.
+
+    Cached ASTs are shared between callers and must be treated as read-only.
+    """
+
+    def __init__(self, maxsize: int = 128, disk_dir: Optional[str] = None):
+        self.maxsize = maxsize
+        self.disk_dir = disk_dir
+        self.hits = 0
+        self.misses = 0
+        # abspath -> (mtime_ns, size, digest, ast)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def parse(self, path: str) -> Program:
+        key = os.path.abspath(path)
+        st = os.stat(key)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == st.st_mtime_ns and entry[1] == st.st_size:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[3]
+
+        with open(key, "rb") as f:
+            content = f.read()
+        digest = hashlib.sha256(content).hexdigest()
+
+        if entry is not None and entry[2] == digest:
+            ast = entry[3]
+            self.hits += 1
+        else:
+            ast = self._load_disk(digest)
+            if ast is None:
+                self.misses += 1
+                text = content.decode("utf-8")
+                ast = parse_tokens(iter_tokens(io.StringIO(text, newline=None)))
+                self._store_disk(digest, ast)
+            else:
+                self.hits += 1
+
+        with self._lock:
+            self._entries[key] = (st.st_mtime_ns, st.st_size, digest, ast)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return ast
+
+    def invalidate(self, path: Optional[str] = None) -> None:
+        """Drop one path (or everything) from the memory cache."""
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(os.path.abspath(path), None)
+
+    # ---- disk store ----
+
+    def _disk_path(self, digest: str) -> str:
+        return os.path.join(self.disk_dir, f"{digest}.ast")
+
+    def _load_disk(self, digest: str) -> Optional[Program]:
+        if not self.disk_dir:
+            return None
+        try:
+            with open(self._disk_path(digest), "rb") as f:
+                fmt, data = marshal.load(f)
+            if fmt != AST_FORMAT or not isinstance(data, dict):
+                return None
+            ast = from_dict(data)
+        except (OSError, EOFError, ValueError, TypeError, KeyError):
+            return None
+        return ast if isinstance(ast, Program) else None
+
+    def _store_disk(self, digest: str, ast: Program) -> None:
+        if not self.disk_dir:
+            return
+        target = self._disk_path(digest)
+        tmp = f"{target}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            with open(tmp, "wb") as f:
+                marshal.dump((AST_FORMAT, ast.to_dict()), f)
+            os.replace(tmp, target)
+        except OSError:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
@@ -2,7 +2,8 @@
 
 class CatapillarError(Exception):
     """Base class for all Catapillar errors."""
-    pass
+    # Source line the error refers to, when known (set by the parser)
+    lineno = None
 
 
 class TokenizeError(CatapillarError):
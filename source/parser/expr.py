@@ -2,10 +2,25 @@
 # Catapillar expression parser (recursive descent).
 # Grammar: Expression → OrExpr → AndExpr → ... → Primary (Literal | Identifier | List | Dict | "(" Expr ")" | index).
 
-from typing import List, Dict, Tuple, Optional
+from typing import List, Tuple, Optional
 
 from parser.errors import ParseError
 from parser.tokenizer import tokenize_expression
+from parser.nodes import (
+    Node,
+    NumberLiteral,
+    BoolLiteral,
+    NoneLiteral,
+    Identifier,
+    StringLiteral,
+    BinaryExpr,
+    UnaryExpr,
+    ListLiteral,
+    DictEntry,
+    DictLiteral,
+    IndexAccess,
+    CallExpr,
+)
 from parser.constants import (
     COMPARE_OPS,
     BOOL_TRUE,
@@ -21,7 +36,7 @@ def parse_expression(
     pos: int = 0,
     value_context: bool = False,
     known_names: Optional[set] = None,
-) -> Tuple[Dict, int]:
+) -> Tuple[Node, int]:
     """value_context=True: bare identifier → string (or variable if known_names and name in it)."""
     return _parse_or(tokens, pos, value_context, known_names)
 
@@ -31,7 +46,7 @@ def _parse_or(tokens, pos, value_context=False, known_names=None):
     while pos < len(tokens) and tokens[pos] in ("或", "or"):
         pos += 1
         right, pos = _parse_and(tokens, pos, value_context, known_names)
-        left = {"type": "BinaryExpr", "op": "or", "left": left, "right": right}
+        left = BinaryExpr("or", left, right)
     return left, pos
 
 
@@ -40,7 +55,7 @@ def _parse_and(tokens, pos, value_context=False, known_names=None):
     while pos < len(tokens) and tokens[pos] in ("且", "and"):
         pos += 1
         right, pos = _parse_not(tokens, pos, value_context, known_names)
-        left = {"type": "BinaryExpr", "op": "and", "left": left, "right": right}
+        left = BinaryExpr("and", left, right)
     return left, pos
 
 
@@ -48,7 +63,7 @@ def _parse_not(tokens, pos, value_context=False, known_names=None):
     if pos < len(tokens) and tokens[pos] in ("非", "not"):
         pos += 1
         operand, pos = _parse_not(tokens, pos, value_context, known_names)
-        return {"type": "UnaryExpr", "op": "not", "operand": operand}, pos
+        return UnaryExpr("not", operand), pos
     return _parse_compare(tokens, pos, value_context, known_names)
 
 
@@ -58,7 +73,7 @@ def _parse_compare(tokens, pos, value_context=False, known_names=None):
         op = COMPARE_OPS[tokens[pos]]
         pos += 1
         right, pos = _parse_add(tokens, pos, value_context=True, known_names=known_names)
-        left = {"type": "BinaryExpr", "op": op, "left": left, "right": right}
+        left = BinaryExpr(op, left, right)
     return left, pos
 
 
@@ -68,7 +83,7 @@ def _parse_add(tokens, pos, value_context=False, known_names=None):
         op = tokens[pos]
         pos += 1
         right, pos = _parse_mul(tokens, pos, value_context, known_names)
-        left = {"type": "BinaryExpr", "op": op, "left": left, "right": right}
+        left = BinaryExpr(op, left, right)
     return left, pos
 
 
@@ -78,7 +93,7 @@ def _parse_mul(tokens, pos, value_context=False, known_names=None):
         op = tokens[pos]
         pos += 1
         right, pos = _parse_unary(tokens, pos, value_context, known_names)
-        left = {"type": "BinaryExpr", "op": op, "left": left, "right": right}
+        left = BinaryExpr(op, left, right)
     return left, pos
 
 
@@ -88,7 +103,7 @@ def _parse_unary(tokens, pos, value_context=False, known_names=None):
             op = tokens[pos]
             pos += 1
             operand, pos = _parse_unary(tokens, pos, value_context, known_names)
-            return {"type": "UnaryExpr", "op": op, "operand": operand}, pos
+            return UnaryExpr(op, operand), pos
     return _parse_primary(tokens, pos, value_context, known_names)
 
 
@@ -99,19 +114,19 @@ def _parse_primary(tokens, pos, value_context=False, known_names=None):
     token = tokens[pos]
 
     if token in BOOL_TRUE:
-        node = {"type": "BoolLiteral", "value": True}
+        node = BoolLiteral(True)
         pos += 1
     elif token in BOOL_FALSE:
-        node = {"type": "BoolLiteral", "value": False}
+        node = BoolLiteral(False)
         pos += 1
     elif token in NONE_LITERALS:
-        node = {"type": "NoneLiteral"}
+        node = NoneLiteral()
         pos += 1
     elif token.startswith("``") and token.endswith("``") and len(token) > 4:
-        node = {"type": "StringLiteral", "value": token[2:-2]}
+        node = StringLiteral(token[2:-2])
         pos += 1
     elif _is_numeric(token):
-        node = {"type": "NumberLiteral", "value": token}
+        node = NumberLiteral(token)
         pos += 1
     elif token == "(":
         pos += 1
@@ -130,7 +145,7 @@ def _parse_primary(tokens, pos, value_context=False, known_names=None):
             "BoolLiteral", "NoneLiteral", "ListLiteral", "DictLiteral",
             "UnaryExpr",
         )
-        if ok and node.get("type") in _PAREN_DISALLOWED:
+        if ok and node.type in _PAREN_DISALLOWED:
             raise ParseError(
                 "Parentheses are only for expression grouping (e.g. (a + b) * c). "
                 "Do not use (variable) or (literal); use the name or value without parentheses."
@@ -139,7 +154,7 @@ def _parse_primary(tokens, pos, value_context=False, known_names=None):
         if pos + 1 < len(tokens) and tokens[pos + 1] == "[":
             node, pos = _parse_dict_literal(tokens, pos)
         else:
-            node = {"type": "Identifier", "name": token}
+            node = Identifier(token)
             pos += 1
     elif token == "[":
         node, pos = _parse_list_or_dict(tokens, pos, value_context)
@@ -147,14 +162,14 @@ def _parse_primary(tokens, pos, value_context=False, known_names=None):
         if value_context:
             # Print context: known variable → Identifier, else string
             if known_names is not None:
-                node = {"type": "Identifier", "name": token} if token in known_names else {"type": "StringLiteral", "value": token}
+                node = Identifier(token) if token in known_names else StringLiteral(token)
             else:
-                node = {"type": "StringLiteral", "value": token}
+                node = StringLiteral(token)
         else:
-            node = {"type": "Identifier", "name": token}
+            node = Identifier(token)
         pos += 1
     else:
-        node = {"type": "StringLiteral", "value": token}
+        node = StringLiteral(token)
         pos += 1
 
     while pos < len(tokens) and tokens[pos] == "[":
@@ -163,7 +178,7 @@ def _parse_primary(tokens, pos, value_context=False, known_names=None):
         if pos >= len(tokens) or tokens[pos] != "]":
             raise ParseError("Expected ']' in index access")
         pos += 1
-        node = {"type": "IndexAccess", "container": node, "index": index}
+        node = IndexAccess(node, index)
 
     return node, pos
 
@@ -171,7 +186,7 @@ def _parse_primary(tokens, pos, value_context=False, known_names=None):
 def _parse_list_or_dict(tokens, pos, value_context=False):
     pos += 1
     if pos < len(tokens) and tokens[pos] == "]":
-        return {"type": "ListLiteral", "elements": []}, pos + 1
+        return ListLiteral([]), pos + 1
 
     save_pos = pos
     first, next_pos = parse_expression(tokens, pos, value_context=True)
@@ -187,7 +202,7 @@ def _parse_list_or_dict(tokens, pos, value_context=False):
 
     if pos >= len(tokens) or tokens[pos] != "]":
         raise ParseError("Expected ']' in list literal")
-    return {"type": "ListLiteral", "elements": elements}, pos + 1
+    return ListLiteral(elements), pos + 1
 
 
 def _parse_dict_literal(tokens, pos):
@@ -196,7 +211,7 @@ def _parse_dict_literal(tokens, pos):
         raise ParseError("Expected '[' after map prefix")
     pos += 1
     if pos < len(tokens) and tokens[pos] == "]":
-        return {"type": "DictLiteral", "entries": []}, pos + 1
+        return DictLiteral([]), pos + 1
     return _parse_dict_entries(tokens, pos)
 
 
@@ -208,14 +223,14 @@ def _parse_dict_entries(tokens, pos):
             raise ParseError("Expected ':' in dict entry")
         pos += 1
         value, pos = parse_expression(tokens, pos, value_context=True)
-        entries.append({"key": key, "value": value})
+        entries.append(DictEntry(key, value))
         if pos < len(tokens) and tokens[pos] == "|":
             pos += 1
             continue
         break
     if pos >= len(tokens) or tokens[pos] != "]":
         raise ParseError("Expected ']' in dict literal")
-    return {"type": "DictLiteral", "entries": entries}, pos + 1
+    return DictLiteral(entries), pos + 1
 
 
 def _is_numeric(s: str) -> bool:
@@ -257,7 +272,7 @@ def try_parse_expr_full(
     raw_args: List[str],
     value_context: bool = False,
     known_names: Optional[set] = None,
-) -> Tuple[Dict, bool]:
+) -> Tuple[Optional[Node], bool]:
     if not raw_args:
         return None, False
     expr_tokens = tokenize_expression(raw_args)
@@ -270,7 +285,7 @@ def _try_parse_tokens(
     expr_tokens: List[str],
     value_context: bool = False,
     known_names: Optional[set] = None,
-) -> Tuple[Dict, bool]:
+) -> Tuple[Optional[Node], bool]:
     if not expr_tokens:
         return None, False
     try:
@@ -279,15 +294,15 @@ def _try_parse_tokens(
         )
         if pos == len(expr_tokens):
             return node, True
-        if node.get("type") == "Identifier":
-            func_name = node["name"]
+        if node.type == "Identifier":
+            func_name = node.name
             arg_nodes = []
             while pos < len(expr_tokens):
                 arg, pos = parse_expression(
                     expr_tokens, pos, value_context=True, known_names=known_names
                 )
                 arg_nodes.append(arg)
-            return {"type": "CallExpr", "func": func_name, "args": arg_nodes}, True
+            return CallExpr(func_name, arg_nodes), True
     except ParseError as e:
         if "Parentheses are only for expression grouping" in str(e):
             raise
@@ -297,7 +312,7 @@ def _try_parse_tokens(
 
 def parse_condition(
     raw_args: List[str], known_names: Optional[set] = None
-) -> Dict:
+) -> Node:
     args = strip_trailing_colon(raw_args)
     if not args:
         raise ParseError("Empty condition")
@@ -312,7 +327,7 @@ def parse_condition(
 
 def parse_set_value(
     expr_tokens: List[str], known_names: Optional[set] = None
-) -> Dict:
+) -> Node:
     if not expr_tokens:
         raise ParseError("SET missing value")
     if expr_tokens[0] in ARITH_LEGACY and len(expr_tokens) == 3:
@@ -323,7 +338,7 @@ def parse_set_value(
         right, _ = parse_expression(
             [expr_tokens[2]], 0, value_context=True, known_names=known_names
         )
-        return {"type": "BinaryExpr", "op": op, "left": left, "right": right}
+        return BinaryExpr(op, left, right)
     node, ok = _try_parse_tokens(
         expr_tokens, value_context=True, known_names=known_names
     )
@@ -339,10 +354,10 @@ def parse_set_value(
                 return node
         except ParseError:
             pass
-    return {"type": "StringLiteral", "value": " ".join(expr_tokens)}
+    return StringLiteral(" ".join(expr_tokens))
 
 
-def parse_print_value(raw_args: List[str], known_names: Optional[set] = None) -> Dict:
+def parse_print_value(raw_args: List[str], known_names: Optional[set] = None) -> Node:
     """Parse print argument: if identifier is in known_names → variable, else → string/number."""
     if not raw_args:
         return None
@@ -352,17 +367,17 @@ def parse_print_value(raw_args: List[str], known_names: Optional[set] = None) ->
     if len(expr_tokens) == 1:
         t = expr_tokens[0]
         if t in BOOL_TRUE:
-            return {"type": "BoolLiteral", "value": True}
+            return BoolLiteral(True)
         if t in BOOL_FALSE:
-            return {"type": "BoolLiteral", "value": False}
+            return BoolLiteral(False)
         if t in NONE_LITERALS:
-            return {"type": "NoneLiteral"}
+            return NoneLiteral()
         if _is_numeric(t):
-            return {"type": "NumberLiteral", "value": t}
+            return NumberLiteral(t)
         if t.isidentifier():
             if known_names is not None and t in known_names:
-                return {"type": "Identifier", "name": t}
-            return {"type": "StringLiteral", "value": t}
+                return Identifier(t)
+            return StringLiteral(t)
     try:
         node, pos = parse_expression(expr_tokens, 0, value_context=True, known_names=known_names)
         if pos == len(expr_tokens):
@@ -371,4 +386,4 @@ def parse_print_value(raw_args: List[str], known_names: Optional[set] = None) ->
         if "Parentheses are only for expression grouping" in str(e):
             raise
         pass
-    return {"type": "StringLiteral", "value": " ".join(raw_args)}
+    return StringLiteral(" ".join(raw_args))
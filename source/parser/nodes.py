@@ -0,0 +1,309 @@
+# parser/nodes.py
+# Catapillar AST node classes.
+# Slotted replacements for the dict nodes documented in ast/nodes.py.
+# (Defined here because a top-level `ast` package would shadow the stdlib `ast` module.)
+#
+# Every node still reads like the dict it replaces:
+#   node["type"], node.get("lines", []), "name" in node, node["value"] = ...
+# and to_dict() / from_dict() convert to and from the plain-dict form
+# (used by --print-ast and anything that serializes the AST).
+
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, Optional
+
+
+class Node(Mapping):
+    """
+    Base class for AST nodes.
+
+    Fields live in __slots__; a field that was never assigned reads as a
+    missing key, so optional keys (e.g. Line "emoji") behave as before.
+    `type` is a class attribute and is always present in the mapping view.
+    """
+
+    __slots__ = ()
+    type: Optional[str] = None
+    # Dict keys, parallel to __slots__ (differs only where a key is not a valid name)
+    _keys: tuple = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if "_keys" not in cls.__dict__:
+            cls._keys = cls.__slots__
+        cls._attr_of = dict(zip(cls._keys, cls.__slots__))
+        if cls.type is not None:
+            NODE_TYPES[cls.type] = cls
+
+    # ---- Mapping view ----
+
+    def __getitem__(self, key: str) -> Any:
+        if key == "type" and self.type is not None:
+            return self.type
+        attr = self._attr_of.get(key)
+        if attr is not None:
+            try:
+                return getattr(self, attr)
+            except AttributeError:
+                pass
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        attr = self._attr_of.get(key)
+        if attr is None:
+            raise KeyError(key)
+        setattr(self, attr, value)
+
+    def __contains__(self, key: object) -> bool:
+        if key == "type":
+            return self.type is not None
+        attr = self._attr_of.get(key)
+        return attr is not None and hasattr(self, attr)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __iter__(self) -> Iterator[str]:
+        if self.type is not None:
+            yield "type"
+        for key, attr in zip(self._keys, self.__slots__):
+            if hasattr(self, attr):
+                yield key
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    # ---- Conversion ----
+
+    def to_dict(self) -> Dict:
+        """Plain-dict form of this node and everything below it."""
+        out = {} if self.type is None else {"type": self.type}
+        for key, attr in zip(self._keys, self.__slots__):
+            try:
+                value = getattr(self, attr)
+            except AttributeError:
+                continue
+            out[key] = _to_plain(value)
+        return out
+
+    def __repr__(self) -> str:
+        fields = ", ".join(
+            f"{attr}={getattr(self, attr)!r}"
+            for attr in self.__slots__
+            if hasattr(self, attr)
+        )
+        return f"{self.__class__.__name__}({fields})"
+
+
+NODE_TYPES: Dict[str, type] = {}
+
+
+def _to_plain(value: Any) -> Any:
+    if isinstance(value, Node):
+        return value.to_dict()
+    if isinstance(value, list):
+        return [_to_plain(v) for v in value]
+    return value
+
+
+def from_dict(data: Any) -> Any:
+    """Rebuild node objects from the plain-dict AST form (inverse of Node.to_dict)."""
+    if isinstance(data, list):
+        return [from_dict(v) for v in data]
+    if not isinstance(data, dict):
+        return data
+    cls = NODE_TYPES.get(data.get("type"))
+    if cls is None:
+        if data.keys() == {"key", "value"}:
+            cls = DictEntry
+        else:
+            return {k: from_dict(v) for k, v in data.items()}
+    node = cls.__new__(cls)
+    for key, value in data.items():
+        if key != "type":
+            node[key] = from_dict(value)
+    return node
+
+
+# ============================================================
+# Structure nodes
+# ============================================================
+
+class Program(Node):
+    __slots__ = ("flows",)
+    type = "Program"
+
+    def __init__(self, flows):
+        self.flows = flows
+
+
+class Flow(Node):
+    __slots__ = ("segments",)
+    type = "Flow"
+
+    def __init__(self, segments):
+        self.segments = segments
+
+
+class Segment(Node):
+    __slots__ = ("lines",)
+    type = "Segment"
+
+    def __init__(self, lines):
+        self.lines = lines
+
+
+class Line(Node):
+    """Legacy action line; which fields are set depends on `action`."""
+    __slots__ = (
+        "action", "line_state", "emoji",
+        "name", "container", "var", "func",
+        "index", "iterable", "condition", "value",
+        "call_args", "names", "args",
+    )
+    type = "Line"
+
+    def __init__(self, action, line_state, emoji=None, **fields):
+        self.action = action
+        self.line_state = line_state
+        if emoji:
+            self.emoji = emoji
+        for attr, value in fields.items():
+            setattr(self, attr, value)
+
+
+class Block(Node):
+    __slots__ = ("name", "lines", "line_state")
+    type = "Block"
+
+    def __init__(self, name, lines, line_state):
+        self.name = name
+        self.lines = lines
+        self.line_state = line_state
+
+
+class BlockEnd(Node):
+    __slots__ = ("line_state", "emoji")
+    type = "BLOCK_END"
+
+    def __init__(self, line_state, emoji=None):
+        self.line_state = line_state
+        if emoji:
+            self.emoji = emoji
+
+
+class Arrow(Node):
+    __slots__ = ("from_", "to", "direction", "line_state")
+    _keys = ("from", "to", "direction", "line_state")
+    type = "Arrow"
+
+    def __init__(self, from_, to, direction, line_state):
+        self.from_ = from_
+        self.to = to
+        self.direction = direction
+        self.line_state = line_state
+
+
+# ============================================================
+# Expression nodes (M1)
+# ============================================================
+
+class NumberLiteral(Node):
+    __slots__ = ("value",)
+    type = "NumberLiteral"
+
+    def __init__(self, value):
+        self.value = value
+
+
+class BoolLiteral(Node):
+    __slots__ = ("value",)
+    type = "BoolLiteral"
+
+    def __init__(self, value):
+        self.value = value
+
+
+class NoneLiteral(Node):
+    __slots__ = ()
+    type = "NoneLiteral"
+
+
+class Identifier(Node):
+    __slots__ = ("name",)
+    type = "Identifier"
+
+    def __init__(self, name):
+        self.name = name
+
+
+class StringLiteral(Node):
+    __slots__ = ("value",)
+    type = "StringLiteral"
+
+    def __init__(self, value):
+        self.value = value
+
+
+class BinaryExpr(Node):
+    __slots__ = ("op", "left", "right")
+    type = "BinaryExpr"
+
+    def __init__(self, op, left, right):
+        self.op = op
+        self.left = left
+        self.right = right
+
+
+class UnaryExpr(Node):
+    __slots__ = ("op", "operand")
+    type = "UnaryExpr"
+
+    def __init__(self, op, operand):
+        self.op = op
+        self.operand = operand
+
+
+class ListLiteral(Node):
+    __slots__ = ("elements",)
+    type = "ListLiteral"
+
+    def __init__(self, elements):
+        self.elements = elements
+
+
+class DictEntry(Node):
+    """One key/value pair of a DictLiteral (untyped: plain form is {"key", "value"})."""
+    __slots__ = ("key", "value")
+
+    def __init__(self, key, value):
+        self.key = key
+        self.value = value
+
+
+class DictLiteral(Node):
+    __slots__ = ("entries",)
+    type = "DictLiteral"
+
+    def __init__(self, entries):
+        self.entries = entries
+
+
+class IndexAccess(Node):
+    __slots__ = ("container", "index")
+    type = "IndexAccess"
+
+    def __init__(self, container, index):
+        self.container = container
+        self.index = index
+
+
+class CallExpr(Node):
+    __slots__ = ("func", "args")
+    type = "CallExpr"
+
+    def __init__(self, func, args):
+        self.func = func
+        self.args = args
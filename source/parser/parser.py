@@ -2,10 +2,15 @@
 # Catapillar parser: token list → AST.
 # Supports arrow lines and legacy action lines. Expression parsing lives in parser.expr.
 
-from typing import List, Dict
+import os
+from typing import List, Dict, Iterable, IO, Union
 
 from parser.errors import ParseError
-from parser.tokenizer import tokenize_expression
+from parser.tokenizer import tokenize_expression, LineToken
+from parser.nodes import (
+    Program, Flow, Segment, Line, Block, BlockEnd, Arrow,
+    Identifier, NoneLiteral,
+)
 from parser.constants import ACTION_LOOKUP, STRUCT_LOOKUP, LINE_STATES, IN_KEYWORDS
 from parser.expr import (
     parse_expression,
@@ -21,7 +26,7 @@ from parser.expr import (
 # Core Parser
 # ============================================================
 
-def _declared_names(action_id: str, line_node: Dict, raw_args: List[str]) -> set:
+def _declared_names(action_id: str, line_node: Line, raw_args: List[str]) -> set:
     """Names declared by this line (for print variable resolution)."""
     out = set()
     if action_id == "SET" and "name" in line_node:
@@ -41,30 +46,49 @@ def _declared_names(action_id: str, line_node: Dict, raw_args: List[str]) -> set
     return out
 
 
-def parse_tokens(tokens: List[Dict]) -> Dict:
+def parse_tokens(tokens: Iterable[Union[LineToken, Dict]]) -> Program:
     """
-    Convert token list into Catapillar AST.
+    Convert tokens (a list or any iterable, e.g. iter_tokens()) into Catapillar AST.
+    Plain token dicts are accepted as well as LineToken objects.
     Supports arrow lines (intent flow) and legacy action lines (with expression parsing).
     Tracks known_names (variables declared so far) so 印 can resolve variable vs string.
+    A ParseError gets the line number of the token being parsed (e.lineno).
     """
-    program = {"type": "Program", "flows": []}
-    current_flow = {"type": "Flow", "segments": []}
-    current_segment = {"type": "Segment", "lines": []}
+    last = [None]
+
+    def track():
+        for token in tokens:
+            last[0] = token
+            yield token
+
+    try:
+        return _parse_tokens(track())
+    except ParseError as e:
+        token = last[0]
+        if e.lineno is None and token is not None:
+            e.lineno = token.get("lineno") if isinstance(token, dict) else token.lineno
+        raise
+
+
+def _parse_tokens(tokens: Iterable[Union[LineToken, Dict]]) -> Program:
+    program = Program([])
+    current_flow = Flow([])
+    current_segment = Segment([])
     known_names = set()
 
     for token in tokens:
-        raw_action = token["raw_action"]
-        raw_args = token["raw_args"]
-        line_state = token["line_state"]
-        emoji = token.get("emoji_prefix")
+        if not isinstance(token, LineToken):
+            token = LineToken.from_dict(token)
+        raw_action = token.raw_action
+        raw_args = token.raw_args
+        line_state = token.line_state
+        emoji = token.emoji_prefix
 
         if raw_action in STRUCT_LOOKUP:
             struct_id = STRUCT_LOOKUP[raw_action]
             if struct_id == "BLOCK_END":
-                line_node = {"type": "BLOCK_END", "line_state": line_state}
-                if emoji:
-                    line_node["emoji"] = emoji
-                current_segment["lines"].append(line_node)
+                line_node = BlockEnd(line_state, emoji)
+                current_segment.lines.append(line_node)
                 continue
 
         if line_state not in LINE_STATES:
@@ -79,26 +103,20 @@ def parse_tokens(tokens: List[Dict]) -> Dict:
         if raw_action.endswith(":"):
             block_name = raw_action[:-1]
             if block_name in ["否则", "else"]:
-                line_node = {"type": "Line", "action": "ELSE", "args": [], "line_state": line_state}
-                if emoji:
-                    line_node["emoji"] = emoji
-                current_segment["lines"].append(line_node)
+                line_node = Line("ELSE", line_state, emoji, args=[])
+                current_segment.lines.append(line_node)
                 continue
             elif block_name in ["试", "try"]:
-                line_node = {"type": "Line", "action": "TRY", "args": [], "line_state": line_state}
-                if emoji:
-                    line_node["emoji"] = emoji
-                current_segment["lines"].append(line_node)
+                line_node = Line("TRY", line_state, emoji, args=[])
+                current_segment.lines.append(line_node)
                 continue
             elif block_name in ["终于", "finally"]:
-                line_node = {"type": "Line", "action": "FINALLY", "args": [], "line_state": line_state}
-                if emoji:
-                    line_node["emoji"] = emoji
-                current_segment["lines"].append(line_node)
+                line_node = Line("FINALLY", line_state, emoji, args=[])
+                current_segment.lines.append(line_node)
                 continue
             else:
-                block_node = {"type": "Block", "name": block_name, "lines": [], "line_state": line_state}
-                current_segment["lines"].append(block_node)
+                block_node = Block(block_name, [], line_state)
+                current_segment.lines.append(block_node)
                 known_names.add(block_name)
                 continue
 
@@ -108,24 +126,24 @@ def parse_tokens(tokens: List[Dict]) -> Dict:
                 raise ParseError("Arrow missing target")
             left, right = raw_action, raw_args[idx + 1]
             from_node, to_node = (left, right) if arrow_type == "->" else (right, left)
-            line_node = {"type": "Arrow", "from": from_node, "to": to_node, "direction": arrow_type, "line_state": line_state}
-            current_segment["lines"].append(line_node)
+            line_node = Arrow(from_node, to_node, arrow_type, line_state)
+            current_segment.lines.append(line_node)
         else:
             if raw_action not in ACTION_LOOKUP:
                 raise ParseError(f"Unknown action: {raw_action}")
             action_id = ACTION_LOOKUP[raw_action]
             line_node = _build_action_line(action_id, raw_args, line_state, emoji, known_names)
-            current_segment["lines"].append(line_node)
+            current_segment.lines.append(line_node)
             known_names |= _declared_names(action_id, line_node, raw_args)
 
         if line_state == ">":
-            current_flow["segments"].append(current_segment)
-            current_segment = {"type": "Segment", "lines": []}
+            current_flow.segments.append(current_segment)
+            current_segment = Segment([])
 
-    if current_segment["lines"]:
-        current_flow["segments"].append(current_segment)
-    if current_flow["segments"]:
-        program["flows"].append(current_flow)
+    if current_segment.lines:
+        current_flow.segments.append(current_segment)
+    if current_flow.segments:
+        program.flows.append(current_flow)
 
     return program
 
@@ -136,12 +154,10 @@ def parse_tokens(tokens: List[Dict]) -> Dict:
 
 def _build_action_line(
     action_id: str, raw_args: List[str], line_state: str, emoji: str, known_names: set = None
-) -> Dict:
+) -> Line:
     if known_names is None:
         known_names = set()
-    base = {"type": "Line", "action": action_id, "line_state": line_state}
-    if emoji:
-        base["emoji"] = emoji
+    base = Line(action_id, line_state, emoji)
 
     if action_id == "SET":
         if not raw_args:
@@ -159,33 +175,33 @@ def _build_action_line(
                         close = i
                         break
             if close is not None and close + 1 < len(expr_tokens):
-                base["action"] = "INDEX_SET"
-                base["container"] = expr_tokens[0]
+                base.action = "INDEX_SET"
+                base.container = expr_tokens[0]
                 idx_node, _ = parse_expression(
                     expr_tokens[2:close], 0, value_context=True, known_names=known_names
                 )
-                base["index"] = idx_node
-                base["value"] = parse_set_value(expr_tokens[close + 1:], known_names=known_names)
-                base["args"] = raw_args
+                base.index = idx_node
+                base.value = parse_set_value(expr_tokens[close + 1:], known_names=known_names)
+                base.args = raw_args
                 return base
 
-        base["name"] = expr_tokens[0]
-        base["value"] = (
+        base.name = expr_tokens[0]
+        base.value = (
             parse_set_value(expr_tokens[1:], known_names=known_names)
             if len(expr_tokens) > 1
-            else {"type": "NoneLiteral"}
+            else NoneLiteral()
         )
-        base["args"] = raw_args
+        base.args = raw_args
         return base
 
     if action_id == "PRINT":
-        base["value"] = parse_print_value(raw_args, known_names=known_names)
-        base["args"] = raw_args
+        base.value = parse_print_value(raw_args, known_names=known_names)
+        base.args = raw_args
         return base
 
     if action_id in ("IF", "ELIF", "WHILE"):
-        base["condition"] = parse_condition(raw_args, known_names=known_names)
-        base["args"] = raw_args
+        base.condition = parse_condition(raw_args, known_names=known_names)
+        base.args = raw_args
         return base
 
     if action_id == "FOR":
@@ -199,10 +215,10 @@ def _build_action_line(
             iterable_args, value_context=True, known_names=known_names
         )
         if not ok:
-            node = {"type": "Identifier", "name": " ".join(iterable_args)}
-        base["var"] = var
-        base["iterable"] = node
-        base["args"] = raw_args
+            node = Identifier(" ".join(iterable_args))
+        base.var = var
+        base.iterable = node
+        base.args = raw_args
         return base
 
     if action_id == "RETURN":
@@ -210,36 +226,40 @@ def _build_action_line(
             node, ok = try_parse_expr_full(
                 raw_args, value_context=True, known_names=known_names
             )
-            base["value"] = node if ok else {"type": "Identifier", "name": " ".join(raw_args)}
+            base.value = node if ok else Identifier(" ".join(raw_args))
         else:
-            base["value"] = None
-        base["args"] = raw_args
+            base.value = None
+        base.args = raw_args
         return base
 
     if action_id == "CALL":
         if not raw_args:
             raise ParseError("CALL expects a function name")
-        base["func"] = raw_args[0]
+        base.func = raw_args[0]
         call_args = []
         for a in raw_args[1:]:
             node, ok = try_parse_expr_full(
                 [a], value_context=True, known_names=known_names
             )
-            call_args.append(node if ok else {"type": "Identifier", "name": a})
-        base["call_args"] = call_args
-        base["args"] = raw_args
+            call_args.append(node if ok else Identifier(a))
+        base.call_args = call_args
+        base.args = raw_args
         return base
 
     if action_id == "GLOBAL":
-        base["names"] = list(raw_args)
+        base.names = list(raw_args)
         return base
 
-    base["args"] = raw_args
+    base.args = raw_args
     return base
 
 
-def parse_file(path: str) -> Dict:
-    """Tokenize + parse in one step."""
-    from parser.tokenizer import tokenize_file
-    tokens = tokenize_file(path)
-    return parse_tokens(tokens)
+def parse_file(path: Union[str, IO[str]], cache=None) -> Program:
+    """
+    Tokenize + parse in one step. `path` may also be an open text stream.
+    Pass a parser.ast_cache.AstCache as `cache` to reuse ASTs of unchanged files.
+    """
+    if cache is not None and isinstance(path, (str, os.PathLike)):
+        return cache.parse(path)
+    from parser.tokenizer import iter_tokens
+    return parse_tokens(iter_tokens(path))
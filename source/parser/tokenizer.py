@@ -2,21 +2,36 @@
 # Catapillar v0.1 tokenizer
 # Responsibility: text lines -> tokenized line objects (no AST, no validation)
 
+import os
 import warnings
 import unicodedata
 import re
 
-from typing import List, Dict, Optional
+from bisect import bisect_right
+from collections.abc import Mapping
+from functools import lru_cache
+
+from typing import List, Dict, Optional, Iterable, Iterator, Union, IO
 from parser.errors import TokenizeError
 from parser.errors import CatapillarWarning
 
 
 LINE_STATES = {"~", ">", "<", "!", "?"}
 
-STRUCTURAL_CHARS = set("[]|()")
-COLON_CHARS = {":", "："}
 MAP_PREFIXES = {"映", "map", "辞"}
 
+# One expression token per match, scanned in a single pass:
+#   - a terminated backtick string ``value`` (may contain spaces)
+#   - a single structural / colon character
+#   - a run of any other non-space characters; a run never continues
+#     across a `` pair, even an unterminated one
+_EXPR_TOKEN_RE = re.compile(
+    r"``.*?``"
+    r"|[\[\]|()：:]"
+    r"|[^\s\[\]|()：:](?:[^\s\[\]|()：:`]|`(?!`))*",
+    re.DOTALL,
+)
+
 _EMOJI_RANGES = [
     (0x1F600, 0x1F64F), (0x1F300, 0x1F5FF), (0x1F680, 0x1F6FF),
     (0x1F1E0, 0x1F1FF), (0x2600, 0x26FF),   (0x2700, 0x27BF),
@@ -28,29 +43,112 @@ _EMOJI_RANGES = [
 ]
 
 
+class LineToken(Mapping):
+    """
+    One tokenized source line.
+
+    Slotted to keep large token streams small, but still readable as the
+    dict it replaces: token["raw_action"], token.get("emoji_prefix"),
+    "lineno" in token. Optional fields that are unset (None) read as
+    missing keys, exactly like the old dicts.
+    """
+
+    __slots__ = ("raw_action", "raw_args", "line_state", "emoji_prefix", "lineno")
+    _OPTIONAL = frozenset(("emoji_prefix", "lineno"))
+
+    def __init__(
+        self,
+        raw_action: str,
+        raw_args: List[str],
+        line_state: str = "~",
+        emoji_prefix: Optional[str] = None,
+        lineno: Optional[int] = None,
+    ):
+        self.raw_action = raw_action
+        self.raw_args = raw_args
+        self.line_state = line_state
+        self.emoji_prefix = emoji_prefix
+        self.lineno = lineno
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "LineToken":
+        return cls(
+            data["raw_action"],
+            data["raw_args"],
+            data["line_state"],
+            data.get("emoji_prefix"),
+            data.get("lineno"),
+        )
+
+    def __getitem__(self, key: str):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        value = getattr(self, key)
+        if value is None and key in self._OPTIONAL:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: str, value) -> None:
+        if key not in self.__slots__:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __iter__(self) -> Iterator[str]:
+        for key in self.__slots__:
+            if key not in self._OPTIONAL or getattr(self, key) is not None:
+                yield key
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def to_dict(self) -> Dict:
+        return {key: getattr(self, key) for key in self}
+
+    def __repr__(self) -> str:
+        return f"LineToken({self.to_dict()!r})"
+
+
+# Merged, sorted copy of _EMOJI_RANGES as parallel arrays for bisect lookup.
+def _merge_ranges(ranges):
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return [s for s, _ in merged], [e for _, e in merged]
+
+
+_EMOJI_STARTS, _EMOJI_ENDS = _merge_ranges(_EMOJI_RANGES)
+_KAOMOJI_CHARS = frozenset("▽△^*><_・ω゜")
+
+
+@lru_cache(maxsize=4096)
 def is_emoji(token: str) -> bool:
     """Check if a token is an emoji or kaomoji."""
     if not token:
         return False
+    first = token[0]
     # Kaomoji: parenthesized face-like patterns
-    if re.match(r'^\(.*\)$', token) and len(token) >= 3:
-        inner = token[1:-1]
-        if any(unicodedata.category(c).startswith("S") or c in "▽△^*><_・ω゜" for c in inner):
-            return True
-    cp = ord(token[0])
-    for start, end in _EMOJI_RANGES:
-        if start <= cp <= end:
-            return True
-    if unicodedata.category(token[0]) == "So":
+    if first == "(" and token[-1] == ")" and len(token) >= 3:
+        for c in token[1:-1]:
+            if c in _KAOMOJI_CHARS or unicodedata.category(c)[0] == "S":
+                return True
+    cp = ord(first)
+    # No emoji range starts below U+200D and ASCII has no "So" characters
+    if cp < 0x80:
+        return False
+    i = bisect_right(_EMOJI_STARTS, cp) - 1
+    if i >= 0 and cp <= _EMOJI_ENDS[i]:
         return True
-    return False
+    return unicodedata.category(first) == "So"
 
 
-def tokenize_line(line: str) -> Optional[Dict]:
+def tokenize_line(line: str) -> Optional[LineToken]:
     """
     Tokenize a single line of Catapillar source.
 
-    Returns a dict with:
+    Returns a LineToken with:
       - raw_action: str
       - raw_args: List[str]
       - line_state: str
@@ -71,8 +169,11 @@ def tokenize_line(line: str) -> Optional[Dict]:
     if stripped.startswith("#"):
         return None
 
-    parts = stripped.split()
+    return _tokenize_parts(stripped.split())
+
 
+def _tokenize_parts(parts: List[str]) -> Optional[LineToken]:
+    """Build a line token from the whitespace-split words of a stripped line."""
     # detect line_state at beginning (v0.1 rule)
     line_state = "~"
     if parts[0] in LINE_STATES:
@@ -94,23 +195,21 @@ def tokenize_line(line: str) -> Optional[Dict]:
         raw_action = raw_args[0]
         raw_args = raw_args[1:]
 
-    result = {
-        "raw_action": raw_action,
-        "raw_args": raw_args,
-        "line_state": line_state,
-    }
-    if emoji_prefix is not None:
-        result["emoji_prefix"] = emoji_prefix
+    return LineToken(raw_action, raw_args, line_state, emoji_prefix)
 
-    return result
 
-
-def tokenize_source(source: str) -> List[Dict]:
-    tokens: List[Dict] = []
+def _scan_lines(lines: Iterable[str]) -> Iterator[LineToken]:
+    """
+    Single pass over source lines: block comments, inline comments and
+    line tokens are handled in one strip/split per line.
+    `lines` is consumed lazily, so it may be a file object or any iterator.
+    """
     in_block_comment = False
 
-    for lineno, line in enumerate(source.splitlines(), start=1):
+    for lineno, line in enumerate(lines, start=1):
         stripped = line.strip()
+        if not stripped:
+            continue
 
         # toggle block comment
         if stripped == "~~":
@@ -121,31 +220,54 @@ def tokenize_source(source: str) -> List[Dict]:
         if in_block_comment:
             continue
 
+        # ignore comment lines (v0.1 simple rule)
+        if stripped[0] == "#":
+            continue
+
         # ⚠️ 行尾注释：警告 + 忽略
-        if "#" in stripped and not stripped.startswith("#"):
+        if "#" in stripped:
             warnings.warn(
                 f"Inline comments are not supported in Catapillar v0.1 (ignored) "
                 f"[line {lineno}]",
                 CatapillarWarning,
                 stacklevel=2
             )
-            stripped = stripped.split("#", 1)[0].rstrip()
+            stripped = stripped.split("#", 1)[0]
 
-        token = tokenize_line(stripped)   # ✅ 用处理后的行
+        token = _tokenize_parts(stripped.split())
         if token is not None:
-            token["lineno"] = lineno
-            tokens.append(token)
+            token.lineno = lineno
+            yield token
 
-    return tokens
+
+def tokenize_source(source: Union[str, Iterable[str]]) -> List[LineToken]:
+    """
+    Tokenize Catapillar source text.
+    `source` may be a whole string or an iterable of lines (e.g. an open file).
+    """
+    if isinstance(source, str):
+        source = source.splitlines()
+    return list(_scan_lines(source))
+
+
+def iter_tokens(path_or_stream: Union[str, "os.PathLike[str]", IO[str]]) -> Iterator[LineToken]:
+    """
+    Lazily tokenize a .cat file path or an open text stream.
+    Lines are read one at a time, so tokens can be consumed (e.g. by
+    parse_tokens) before the whole file has been read.
+    """
+    if isinstance(path_or_stream, (str, os.PathLike)):
+        with open(path_or_stream, "r", encoding="utf-8") as f:
+            yield from _scan_lines(f)
+    else:
+        yield from _scan_lines(path_or_stream)
 
 
-def tokenize_file(path: str) -> List[Dict]:
+def tokenize_file(path: str) -> List[LineToken]:
     """
     Read a .cat file and tokenize it.
     """
-    with open(path, "r", encoding="utf-8") as f:
-        source = f.read()
-    return tokenize_source(source)
+    return list(iter_tokens(path))
 
 
 # ============================================================
@@ -160,66 +282,4 @@ def tokenize_expression(raw_args: List[str]) -> List[str]:
     Handles structural characters: [ ] | ( ) : ：
     Handles backtick-wrapped strings: ``value``
     """
-    joined = " ".join(raw_args)
-    return _split_expr_text(joined)
-
-
-def _split_expr_text(text: str) -> List[str]:
-    """Tokenize expression text, respecting backtick strings."""
-    tokens = []
-    i = 0
-    current = ""
-
-    while i < len(text):
-        ch = text[i]
-
-        # Backtick-wrapped strings ``value``
-        if ch == '`' and i + 1 < len(text) and text[i + 1] == '`':
-            if current.strip():
-                tokens.extend(_split_structural(current.strip()))
-                current = ""
-            end = text.find('``', i + 2)
-            if end != -1:
-                tokens.append(text[i:end + 2])
-                i = end + 2
-                continue
-            current += ch
-            i += 1
-            continue
-
-        if ch in (' ', '\t'):
-            if current.strip():
-                tokens.extend(_split_structural(current.strip()))
-                current = ""
-            i += 1
-            continue
-
-        current += ch
-        i += 1
-
-    if current.strip():
-        tokens.extend(_split_structural(current.strip()))
-
-    return tokens
-
-
-def _split_structural(token: str) -> List[str]:
-    """
-    Split a single token at structural character boundaries.
-    E.g. "[1" → ["[", "1"], "映[" → ["映", "["], "key:" → ["key", ":"]
-    """
-    if not token:
-        return []
-    result = []
-    current = ""
-    for ch in token:
-        if ch in STRUCTURAL_CHARS or ch in COLON_CHARS:
-            if current:
-                result.append(current)
-                current = ""
-            result.append(ch)
-        else:
-            current += ch
-    if current:
-        result.append(current)
-    return result
+    return _EXPR_TOKEN_RE.findall(" ".join(raw_args))
@@ -1,8 +1,10 @@
 # runtime/api_nodes.py
 
+from runtime import log
 from runtime.nodes import capability
 from runtime.intents import *
-import requests  # 你之后可以换成 httpx 或自己写
+from runtime.http_client import get_client
+from runtime import http_cache
 
 @capability(INTENT_INPUT)
 def node_input(ctx):
@@ -10,35 +12,75 @@ def node_input(ctx):
     text = ctx.get("input")
     if text is None:
         text = input("Enter URL: ")
-    print("[INPUT] URL:", text)
+    log.info("INPUT", "URL: %s", text)
     return {"url": text}
 
 
 @capability(INTENT_PARSE_URL)
 def node_parse_url(ctx):
     url = ctx.get("url", "").strip()
-    print("[PARSE_URL] Parsed URL:", url)
+    log.info("PARSE_URL", "Parsed URL: %s", url)
     return {"url": url}
 
 
 @capability(INTENT_HTTP_REQUEST)
 def node_http_request(ctx):
     url = ctx.get("url")
-    print("[HTTP] Requesting:", url)
+    # a stream left by an earlier streamed request would stand in for this response's body
+    stale = ctx.pop("response_stream", None)
+    if stale is not None:
+        stale.close()
+    log.info("HTTP", "Requesting: %s", url, url=url)
+
+    # Shared pooled client unless the flow brings its own; timeout from ctx or client config
+    client = ctx.get("http_client") or get_client()
+    # ctx["http_stream"]: hand the body to later nodes as a ResponseStream instead of reading it
+    # ctx["http_max_body"]: cap on body bytes (default: client config)
+    streaming = ctx.get("http_stream", False)
+    max_body = ctx.get("http_max_body", client.config.max_body)
+
+    # ctx["http_cache"]: a ResponseCache for this flow (default: the runtime-wide one, if enabled)
+    cache = None if streaming else ctx.get("http_cache") or http_cache.get_cache()
 
     try:
-        resp = requests.get(url, timeout=5)
+        if cache is not None:
+            status, body, info = cache.fetch(client, url, timeout=ctx.get("http_timeout"), max_body=max_body)
+            stats = cache.stats()
+            log.info("HTTP", "Status: %s (cache %s)", status, info["cache"], status=status, cache=info["cache"])
+            ctx["status_code"] = status
+            ctx["response_body"] = body
+            return {
+                "status_code": status,
+                "response_body": body,
+                "http_cache_status": info["cache"],
+                "http_cache_hits": stats["hits"],
+                "http_cache_misses": stats["misses"],
+                "http_latency_ms": info.get("latency_ms"),
+                "http_connection_reused": info.get("connection_reused"),
+            }
+
+        if streaming or max_body is not None:
+            resp, info, stream = client.stream(url, timeout=ctx.get("http_timeout"), max_body=max_body)
+        else:
+            resp, info = client.get(url, timeout=ctx.get("http_timeout"))
+            stream = None
         status = resp.status_code
-        body = resp.text
-        print(f"[HTTP] Status: {status}")
+        log.info("HTTP", "Status: %s", status, status=status, latency_ms=info["latency_ms"])
         ctx["status_code"] = status
-        ctx["response_body"] = body
-        return {
+        result = {
             "status_code": status,
-            "response_body": body,
+            "http_latency_ms": info["latency_ms"],
+            "http_connection_reused": info["connection_reused"],
         }
+        if streaming:
+            result["response_stream"] = stream
+        else:
+            body = resp.text if stream is None else stream.read()
+            ctx["response_body"] = body
+            result["response_body"] = body
+        return result
     except Exception as e:
-        print("[HTTP] Error:", e)
+        log.error("HTTP", "Error: %s", e, url=url)
         ctx["status_code"] = 0
         ctx["response_body"] = str(e)
         return {
@@ -49,34 +91,47 @@ def node_http_request(ctx):
 
 @capability(INTENT_HANDLE_SUCCESS)
 def node_handle_success(ctx):
-    print("[SUCCESS] Handling success branch")
+    log.info("SUCCESS", "Handling success branch")
     return ctx
 
 
 @capability(INTENT_HANDLE_ERROR)
 def node_handle_error(ctx):
-    print("[ERROR] Handling error branch")
+    log.info("ERROR", "Handling error branch")
     return ctx
 
 
+def _response_body(ctx, n_chars=None):
+    """
+    The response body (or its first n_chars). A streamed body is read only
+    as far as needed and then closed, so the rest is never downloaded.
+    """
+    stream = ctx.get("response_stream")
+    if stream is None:
+        body = ctx.get("response_body", "")
+        return body if n_chars is None else body[:n_chars]
+    text = stream.read(n_chars)
+    stream.close()
+    return text
+
+
 @capability(INTENT_EXTRACT_DATA)
 def node_extract_data(ctx):
-    body = ctx.get("response_body", "")
     # 这里简单截断展示，真实系统你可以做 JSON 解析等
-    snippet = body[:120]
-    print("[EXTRACT] Snippet:", snippet)
+    snippet = _response_body(ctx, 120)
+    log.info("EXTRACT", "Snippet: %s", snippet)
     return {"snippet": snippet}
 
 
 @capability(INTENT_OUTPUT_SUCCESS)
 def node_output_success(ctx):
     snippet = ctx.get("snippet", "")
-    print("[OUTPUT_SUCCESS] Data snippet:\n", snippet)
+    log.info("OUTPUT_SUCCESS", "Data snippet:\n %s", snippet)
     return ctx
 
 
 @capability(INTENT_OUTPUT_ERROR)
 def node_output_error(ctx):
-    body = ctx.get("response_body", "")
-    print("[OUTPUT_ERROR] Error body:\n", body)
+    body = _response_body(ctx)
+    log.info("OUTPUT_ERROR", "Error body:\n %s", body)
     return ctx
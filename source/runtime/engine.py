@@ -1,28 +1,142 @@
-from runtime.nodes import CAPABILITIES
+import asyncio
+import time
+from collections.abc import Mapping
+
+from runtime import log
+from runtime.nodes import ASYNC_CAPABILITIES, CAPABILITIES
 from runtime.router import Router
 
 router = Router()
 
-def run_flow(flow, ctx):
-    current = flow[0]
+# Default visits per intent: 1 stops at the first repeat ("Loop detected")
+DEFAULT_VISITS = 1
+
+
+class _Limits:
+    """Visit / step / deadline budgets of one run (see run_flow)."""
+
+    __slots__ = ("budgets", "default_budget", "max_steps", "deadline", "counts", "steps")
+
+    def __init__(self, visits, max_steps, timeout):
+        if isinstance(visits, Mapping):
+            self.budgets, self.default_budget = visits, DEFAULT_VISITS
+        else:
+            self.budgets, self.default_budget = None, visits
+        self.max_steps = max_steps
+        self.deadline = time.monotonic() + timeout if timeout is not None else None
+        self.counts = {}
+        self.steps = 0
+
+    def enter(self, current):
+        """Count a step into `current`; returns the stop message if a budget is spent."""
+        count = self.counts.get(current, 0) + 1
+        budget = self.default_budget if self.budgets is None else self.budgets.get(current, self.default_budget)
+        if count > budget:
+            return "Loop detected. Stopping."
+        self.counts[current] = count
+
+        if self.max_steps is not None and self.steps >= self.max_steps:
+            return "Step budget exhausted. Stopping."
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            return "Deadline reached. Stopping."
+        self.steps += 1
+        return None
+
+    def remaining(self):
+        return None if self.deadline is None else max(self.deadline - time.monotonic(), 0.0)
 
-    visited = set()
+
+def run_flow(flow, ctx, transitions=None, visits=DEFAULT_VISITS, max_steps=None, timeout=None):
+    """
+    Run from flow[0] until a step routes to None.
+    `transitions` (a TransitionTable, e.g. compiled from the .cat arrows)
+    replaces the built-in Router.
+
+    Bounds, checked before each step:
+      visits     how often one intent may run: an int for every intent, or a
+                 mapping intent → budget (others get DEFAULT_VISITS)
+      max_steps  total steps for the whole run
+      timeout    wall-clock seconds (checked between steps, a running node
+                 is never interrupted)
+
+    Async capabilities are run to completion with asyncio.run.
+    Returns ctx.
+    """
+    table = transitions if transitions is not None else router.table
+    next_intent = table.next
+    capabilities = CAPABILITIES
+    limits = _Limits(visits, max_steps, timeout)
+
+    current = flow[0] if flow else table.entry
 
     while current:
 
-        if current in visited:
-            print("Loop detected. Stopping.")
+        stop = limits.enter(current)
+        if stop:
+            log.warning(None, stop, intent=current, steps=limits.steps)
             break
-        visited.add(current)
 
-        node_fn = CAPABILITIES.get(current)
+        node_fn = capabilities.get(current)
 
         if not node_fn:
             raise RuntimeError(f"No capability for {current}")
 
         result = node_fn(ctx)
+        if current in ASYNC_CAPABILITIES:
+            result = asyncio.run(result)
         if isinstance(result, dict):
             ctx.update(result)
 
-        # 只由 Router 决定下一步
-        current = router.route(current, ctx)
+        # 只由 transition table 决定下一步
+        current = next_intent(current, ctx)
+
+    return ctx
+
+
+async def run_flow_async(flow, ctx, transitions=None, visits=DEFAULT_VISITS, max_steps=None,
+                         timeout=None, executor=None):
+    """
+    asyncio version of run_flow, for multiplexing many flows on one loop.
+
+    `async def` capabilities are awaited; plain capabilities run in
+    `executor` (default: the loop's thread pool) so a blocking node never
+    stalls other flows. With `timeout`, the running step is also cut off
+    at the deadline (an offloaded sync node keeps running in its thread,
+    but the flow stops waiting for it).
+    Returns ctx.
+    """
+    table = transitions if transitions is not None else router.table
+    next_intent = table.next
+    capabilities = CAPABILITIES
+    limits = _Limits(visits, max_steps, timeout)
+    loop = asyncio.get_running_loop()
+
+    current = flow[0] if flow else table.entry
+
+    while current:
+
+        stop = limits.enter(current)
+        if stop:
+            log.warning(None, stop, intent=current, steps=limits.steps)
+            break
+
+        node_fn = capabilities.get(current)
+
+        if not node_fn:
+            raise RuntimeError(f"No capability for {current}")
+
+        if current in ASYNC_CAPABILITIES:
+            step = node_fn(ctx)
+        else:
+            step = loop.run_in_executor(executor, node_fn, ctx)
+        try:
+            result = await asyncio.wait_for(step, limits.remaining())
+        except asyncio.TimeoutError:
+            log.warning(None, "Deadline reached. Stopping.", intent=current, steps=limits.steps)
+            break
+        if isinstance(result, dict):
+            ctx.update(result)
+
+        current = next_intent(current, ctx)
+
+    return ctx
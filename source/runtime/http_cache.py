@@ -0,0 +1,240 @@
+# runtime/http_cache.py
+# Optional response cache in front of INTENT_HTTP_REQUEST.
+# Memory LRU bounded by entry count, optional disk store, TTL, and HTTP
+# caching headers: Cache-Control (no-store / no-cache / max-age) decides what
+# is kept and for how long, ETag / Last-Modified make revalidation a cheap
+# conditional request (304 Not Modified reuses the cached body).
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+_MAX_AGE_RE = re.compile(r"max-age\s*=\s*(\d+)")
+# disk store file names (see ResponseCache._disk_path)
+_DISK_NAME_RE = re.compile(r"[0-9a-f]{64}\.json")
+
+
+class CachedResponse:
+    __slots__ = ("url", "status", "body", "etag", "last_modified", "expires_at")
+
+    def __init__(self, url, status, body, etag=None, last_modified=None, expires_at=0.0):
+        self.url = url
+        self.status = status
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.expires_at = expires_at
+
+    def fresh(self, now: float) -> bool:
+        return now < self.expires_at
+
+    def to_dict(self) -> dict:
+        return {attr: getattr(self, attr) for attr in self.__slots__}
+
+
+class ResponseCache:
+    """
+    GET response cache keyed by URL.
+
+    Responses are kept for the Cache-Control max-age when the server sends
+    one, else for `ttl` seconds; `no-store` responses are never kept and
+    `no-cache` ones are always revalidated. Stale entries with an ETag or
+    Last-Modified are revalidated with a conditional request instead of
+    being fetched again. Only complete 200 responses are stored.
+    """
+
+    def __init__(self, maxsize: int = 256, ttl: float = 60.0, disk_dir: Optional[str] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.disk_dir = disk_dir
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def fetch(self, client, url: str, timeout=None, max_body=None):
+        """
+        Serve `url` from the cache or through `client` (an HttpClient).
+        Returns (status, body, info); info["cache"] is "hit", "revalidated"
+        or "miss", plus the client's latency_ms / connection_reused when a
+        request was made.
+        """
+        now = time.time()
+        entry = self._get(url)
+        if entry is not None and entry.fresh(now):
+            self._count("hits")
+            return entry.status, entry.body, {"cache": "hit"}
+
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+
+        if max_body is None:
+            resp, info = client.get(url, timeout=timeout, headers=headers)
+            stream = None
+        else:
+            resp, info, stream = client.stream(url, timeout=timeout, max_body=max_body, headers=headers)
+
+        if resp.status_code == 304 and entry is not None:
+            if stream is not None:
+                stream.close()
+            self._count("revalidated")
+            self._store(self._refreshed(entry, resp.headers, time.time()))
+            return entry.status, entry.body, dict(info, cache="revalidated")
+
+        body = resp.text if stream is None else stream.read()
+        self._count("misses")
+        if resp.status_code == 200 and (stream is None or not stream.truncated):
+            fresh = self._build(url, resp.status_code, body, resp.headers, time.time())
+            if fresh is not None:
+                self._store(fresh)
+        return resp.status_code, body, dict(info, cache="miss")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "revalidated": self.revalidated,
+                "entries": len(self._entries),
+            }
+
+    def invalidate(self, url: Optional[str] = None) -> None:
+        """Drop one URL (or everything) from memory and disk."""
+        with self._lock:
+            urls = list(self._entries) if url is None else [url]
+            for key in urls:
+                self._entries.pop(key, None)
+        if not self.disk_dir:
+            return
+        if url is not None:
+            paths = [self._disk_path(url)]
+        else:
+            try:
+                names = os.listdir(self.disk_dir)
+            except OSError:
+                names = []
+            paths = [os.path.join(self.disk_dir, name) for name in names if _DISK_NAME_RE.fullmatch(name)]
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    # ---- freshness ----
+
+    def _lifetime(self, headers) -> Optional[float]:
+        """Seconds to keep a response, 0 to always revalidate, None to not store it."""
+        cache_control = (headers.get("Cache-Control") or "").lower()
+        if "no-store" in cache_control:
+            return None
+        if "no-cache" in cache_control:
+            return 0.0
+        m = _MAX_AGE_RE.search(cache_control)
+        return float(m.group(1)) if m else self.ttl
+
+    def _build(self, url, status, body, headers, now) -> Optional[CachedResponse]:
+        lifetime = self._lifetime(headers)
+        if lifetime is None:
+            return None
+        return CachedResponse(
+            url, status, body,
+            headers.get("ETag"), headers.get("Last-Modified"),
+            now + lifetime,
+        )
+
+    def _refreshed(self, entry, headers, now) -> CachedResponse:
+        lifetime = self._lifetime(headers)
+        return CachedResponse(
+            entry.url, entry.status, entry.body,
+            headers.get("ETag") or entry.etag,
+            headers.get("Last-Modified") or entry.last_modified,
+            now + (lifetime or 0.0),
+        )
+
+    # ---- storage ----
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _get(self, url: str) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is not None:
+                self._entries.move_to_end(url)
+                return entry
+        entry = self._load_disk(url)
+        if entry is not None:
+            self._remember(entry)
+        return entry
+
+    def _store(self, entry: CachedResponse) -> None:
+        self._remember(entry)
+        self._store_disk(entry)
+
+    def _remember(self, entry: CachedResponse) -> None:
+        with self._lock:
+            self._entries[entry.url] = entry
+            self._entries.move_to_end(entry.url)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def _disk_path(self, url: str) -> str:
+        return os.path.join(self.disk_dir, hashlib.sha256(url.encode("utf-8")).hexdigest() + ".json")
+
+    def _load_disk(self, url: str) -> Optional[CachedResponse]:
+        if not self.disk_dir:
+            return None
+        try:
+            with open(self._disk_path(url), "r", encoding="utf-8") as f:
+                data = json.load(f)
+            entry = CachedResponse(**data)
+        except (OSError, ValueError, TypeError):
+            return None
+        return entry if entry.url == url else None
+
+    def _store_disk(self, entry: CachedResponse) -> None:
+        if not self.disk_dir:
+            return
+        target = self._disk_path(entry.url)
+        tmp = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(entry.to_dict(), f, ensure_ascii=False)
+            os.replace(tmp, target)
+        except OSError:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+
+
+_default_cache: Optional[ResponseCache] = None
+
+
+def get_cache() -> Optional[ResponseCache]:
+    """The runtime-wide cache, or None when caching is off (the default)."""
+    return _default_cache
+
+
+def enable(maxsize: int = 256, ttl: float = 60.0, disk_dir: Optional[str] = None) -> ResponseCache:
+    """Turn on the runtime-wide cache for INTENT_HTTP_REQUEST."""
+    global _default_cache
+    _default_cache = ResponseCache(maxsize, ttl, disk_dir)
+    return _default_cache
+
+
+def disable() -> None:
+    global _default_cache
+    _default_cache = None
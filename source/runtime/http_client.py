@@ -0,0 +1,250 @@
+# runtime/http_client.py
+# Shared HTTP client for the API capabilities (INTENT_HTTP_REQUEST).
+# One pooled requests.Session per runtime: keep-alive connections reused
+# across flows, per-host pool limits, retries with backoff, default timeouts,
+# and latency / connection-reuse metrics.
+
+import codecs
+import threading
+import time
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+
+
+class HttpConfig:
+    """
+    Settings of an HttpClient.
+
+    pool_hosts      how many per-host connection pools to keep
+    pool_size       keep-alive connections per host
+    pool_block      wait for a free connection instead of opening extra ones
+    retries         retries for connection errors and `retry_statuses`
+    backoff         backoff factor between retries (0.5 → 0.5s, 1s, 2s, ...)
+    retry_statuses  HTTP statuses that are retried
+    timeout         default timeout in seconds, or (connect, read)
+    max_body        default cap on bytes read from one response body (None: no cap)
+    chunk_size      bytes per chunk when streaming a body
+    """
+
+    __slots__ = (
+        "pool_hosts", "pool_size", "pool_block", "retries", "backoff", "retry_statuses",
+        "timeout", "max_body", "chunk_size",
+    )
+
+    def __init__(self, pool_hosts=16, pool_size=10, pool_block=False, retries=2, backoff=0.2,
+                 retry_statuses=(502, 503, 504), timeout=5, max_body=None, chunk_size=8192):
+        self.pool_hosts = pool_hosts
+        self.pool_size = pool_size
+        self.pool_block = pool_block
+        self.retries = retries
+        self.backoff = backoff
+        self.retry_statuses = tuple(retry_statuses)
+        self.timeout = timeout
+        self.max_body = max_body
+        self.chunk_size = chunk_size
+
+
+class HttpMetrics:
+    """Counters of one HttpClient (thread-safe)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.reused = 0  # served on an already open keep-alive connection
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def record(self, latency: float, reused: bool, error: bool) -> None:
+        with self._lock:
+            self.requests += 1
+            self.errors += error
+            self.reused += reused
+            self.latency_total += latency
+            self.latency_max = max(self.latency_max, latency)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            n = self.requests
+            return {
+                "requests": n,
+                "errors": self.errors,
+                "connections_reused": self.reused,
+                "latency_avg_ms": self.latency_total / n * 1000 if n else 0.0,
+                "latency_max_ms": self.latency_max * 1000,
+            }
+
+
+class HttpClient:
+    """Pooled session plus metrics; safe to share between flows and threads."""
+
+    def __init__(self, config: Optional[HttpConfig] = None):
+        self.config = config or HttpConfig()
+        self.metrics = HttpMetrics()
+        self.session = requests.Session()
+        retry = Retry(
+            total=self.config.retries,
+            backoff_factor=self.config.backoff,
+            status_forcelist=self.config.retry_statuses,
+            allowed_methods=frozenset(["GET", "HEAD", "OPTIONS"]),
+            raise_on_status=False,
+        )
+        self._adapter = HTTPAdapter(
+            pool_connections=self.config.pool_hosts,
+            pool_maxsize=self.config.pool_size,
+            pool_block=self.config.pool_block,
+            max_retries=retry,
+        )
+        self.session.mount("http://", self._adapter)
+        self.session.mount("https://", self._adapter)
+
+        # Pools that flag (per thread) when a request had to open a new connection
+        self._local = threading.local()
+        local = self._local
+        self._adapter.poolmanager.pool_classes_by_scheme = {
+            "http": _counting_pool(HTTPConnectionPool, local),
+            "https": _counting_pool(HTTPSConnectionPool, local),
+        }
+
+    def request(self, method: str, url: str, timeout=None, **kwargs):
+        """
+        Send a request through the pool. Returns (response, info) where info
+        holds this request's latency_ms and whether it was served on a reused
+        keep-alive connection. Errors are counted, then re-raised.
+        """
+        if timeout is None:
+            timeout = self.config.timeout
+        self._local.opened = False
+        t0 = time.perf_counter()
+        try:
+            resp = self.session.request(method, url, timeout=timeout, **kwargs)
+        except Exception:
+            self.metrics.record(time.perf_counter() - t0, False, True)
+            raise
+        latency = time.perf_counter() - t0
+        reused = not self._local.opened
+        self.metrics.record(latency, reused, False)
+        return resp, {"latency_ms": latency * 1000, "connection_reused": reused}
+
+    def get(self, url: str, timeout=None, **kwargs):
+        return self.request("GET", url, timeout=timeout, **kwargs)
+
+    def stream(self, url: str, timeout=None, max_body=None, **kwargs):
+        """
+        GET without reading the body: returns (response, info, ResponseStream).
+        latency_ms is the time to the response headers.
+        """
+        resp, info = self.request("GET", url, timeout=timeout, stream=True, **kwargs)
+        if max_body is None:
+            max_body = self.config.max_body
+        return resp, info, ResponseStream(resp, self.config.chunk_size, max_body)
+
+    def close(self) -> None:
+        self.session.close()
+
+
+class ResponseStream:
+    """
+    A streamed response body as text chunks, read lazily and capped at
+    `max_bytes`. Consumers read only what they need and close() the rest
+    away; reaching the end of the body (or the cap) closes it too.
+    """
+
+    def __init__(self, resp, chunk_size=8192, max_bytes=None):
+        self._resp = resp
+        self._chunks = resp.iter_content(chunk_size)
+        self._decoder = codecs.getincrementaldecoder(resp.encoding or "utf-8")(errors="replace")
+        self._pending = ""
+        self.max_bytes = max_bytes
+        self.bytes_read = 0
+        self.truncated = False  # stopped at max_bytes before the end of the body
+        self.closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        if self._pending:
+            text, self._pending = self._pending, ""
+            return text
+        while not self.closed:
+            text = self._next_text()
+            if text:
+                return text
+        raise StopIteration
+
+    def read(self, n_chars=None) -> str:
+        """Up to `n_chars` characters (everything left, within the cap, when None)."""
+        parts = []
+        size = 0
+        for text in self:
+            if n_chars is not None and size + len(text) >= n_chars:
+                keep = n_chars - size
+                parts.append(text[:keep])
+                self._pending = text[keep:]
+                break
+            parts.append(text)
+            size += len(text)
+        return "".join(parts)
+
+    def close(self) -> None:
+        if not self.closed:
+            self.closed = True
+            self._resp.close()
+
+    def _next_text(self) -> str:
+        try:
+            chunk = next(self._chunks)
+        except StopIteration:
+            self.close()
+            return self._decoder.decode(b"", final=True)
+        if self.max_bytes is not None and self.bytes_read + len(chunk) > self.max_bytes:
+            chunk = chunk[:self.max_bytes - self.bytes_read]
+            self.truncated = True
+            self.bytes_read += len(chunk)
+            self.close()
+            return self._decoder.decode(chunk, final=True)
+        self.bytes_read += len(chunk)
+        return self._decoder.decode(chunk)
+
+    def __repr__(self) -> str:
+        return f"ResponseStream(bytes_read={self.bytes_read}, closed={self.closed})"
+
+
+def _counting_pool(base, local):
+    class CountingPool(base):
+        def _new_conn(self):
+            local.opened = True
+            return super()._new_conn()
+
+    CountingPool.__name__ = f"Counting{base.__name__}"
+    return CountingPool
+
+
+_default_client: Optional[HttpClient] = None
+_default_lock = threading.Lock()
+
+
+def get_client() -> HttpClient:
+    """The runtime's shared client (created on first use)."""
+    global _default_client
+    if _default_client is None:
+        with _default_lock:
+            if _default_client is None:
+                _default_client = HttpClient()
+    return _default_client
+
+
+def configure(**settings) -> HttpClient:
+    """Replace the shared client with one built from HttpConfig(**settings)."""
+    global _default_client
+    client = HttpClient(HttpConfig(**settings))
+    with _default_lock:
+        old, _default_client = _default_client, client
+    if old is not None:
+        old.close()
+    return client
@@ -4,6 +4,7 @@ INTENT_PARSE = "INTENT_PARSE"
 INTENT_DECIDE = "INTENT_DECIDE"
 INTENT_ACTION = "INTENT_ACTION"
 INTENT_FEEDBACK = "INTENT_FEEDBACK"
+INTENT_PARSE_BATCH = "INTENT_PARSE_BATCH"
 
 # API 专用意图
 INTENT_PARSE_URL = "INTENT_PARSE_URL"
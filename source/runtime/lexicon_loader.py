@@ -1,16 +1,485 @@
-import yaml
+import marshal
 import os
+import threading
+import unicodedata
+from collections import Counter
+from collections.abc import Mapping
+from types import MappingProxyType
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
 
+from runtime import log
+
+# Merged view of every lexicon loaded through load_lexicon (kept for existing callers;
+# new code should resolve against a LexiconRegistry snapshot). Read-only in effect:
+# the global lookups use REGISTRY.snapshot(), and each load rebuilds this dict.
 LEXICON = {}
 
-def load_lexicon(path):
+# Compiled lexicons (`catapillar.py lexicon compile`): a marshalled
+# alias → intent table next to the YAML source, used instead of parsing the
+# YAML whenever it is at least as new as the source.
+COMPILED_DIR = "__catcache__"
+COMPILED_SUFFIX = ".catlex"
+_MAGIC = "CATLEX"
+_FORMAT = 1
+
+
+def compiled_path(path):
+    """lexicon/default.yaml → lexicon/__catcache__/default.yaml.catlex"""
+    head, tail = os.path.split(path)
+    return os.path.join(head, COMPILED_DIR, tail + COMPILED_SUFFIX)
+
+
+def _read_yaml(path):
+    import yaml
+
     with open(path, "r", encoding="utf-8") as f:
         data = yaml.safe_load(f)
 
+    table = {}
     for intent_id, config in data.items():
         for alias in config.get("aliases", []):
-            LEXICON[alias] = intent_id
+            table[alias] = intent_id
+    return table
+
+
+def _read_compiled(path):
+    """The compiled table for `path`, or None if missing, stale or unreadable."""
+    target = compiled_path(path)
+    try:
+        if os.stat(target).st_mtime_ns < os.stat(path).st_mtime_ns:
+            return None
+        with open(target, "rb") as f:
+            magic, fmt, table = marshal.load(f)
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    if magic != _MAGIC or fmt != _FORMAT or not isinstance(table, dict):
+        return None
+    return table
+
+
+def compile_lexicon(path):
+    """Write the compiled form of one YAML lexicon; returns (artifact path, alias count)."""
+    table = _read_yaml(path)
+    target = compiled_path(path)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    tmp = f"{target}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        marshal.dump((_MAGIC, _FORMAT, table), f)
+    os.replace(tmp, target)
+    return target, len(table)
+
+
+# ============================================================
+# Normalized and fuzzy lookup
+# ============================================================
+
+# Fuzzy matches scoring below this are ignored
+FUZZY_MIN_SCORE = 0.75
+
+
+class Match(NamedTuple):
+    """A resolved intent, the alias it matched and a confidence in [0, 1]."""
+    intent_id: str
+    alias: str
+    score: float
+
+
+def normalize_alias(word: str) -> str:
+    """
+    Lookup key for an alias or user input: NFKC (which also folds full-width
+    ASCII and half-width katakana), casefold, collapsed whitespace and no
+    leading/trailing punctuation. "Ｐａｒｓｅ!" and " parse " both → "parse".
+    """
+    text = " ".join(unicodedata.normalize("NFKC", word).casefold().split())
+    start, end = 0, len(text)
+    while start < end and unicodedata.category(text[start])[0] == "P":
+        start += 1
+    while end > start and unicodedata.category(text[end - 1])[0] == "P":
+        end -= 1
+    return text[start:end]
+
+
+def _bigrams(key: str) -> List[str]:
+    padded = f"\x02{key}\x03"
+    return [padded[i:i + 2] for i in range(len(padded) - 1)]
+
+
+def _max_edits(length: int, min_score: float) -> int:
+    """Largest distance that still scores `min_score` (tolerant of float error, e.g. 5 * (1 - 0.8))."""
+    return int(length * (1 - min_score) + 1e-9)
+
+
+def _edit_distance(a: str, b: str, limit: int) -> int:
+    """Levenshtein distance, or limit + 1 once it is certain to exceed `limit`."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+        if min(cur) > limit:
+            return limit + 1
+        prev = cur
+    return prev[-1]
+
+
+class FuzzyIndex:
+    """
+    Near-miss lookup over normalized aliases: a bigram inverted index picks
+    the aliases that can still reach `min_score`, edit distance scores them.
+    score = 1 - distance / max(len(query), len(alias)).
+    """
+
+    def __init__(self, keys: Iterable[str]):
+        self._keys: List[str] = list(keys)
+        self._postings: Dict[str, set] = {}
+        for key_id, key in enumerate(self._keys):
+            for gram in _bigrams(key):
+                self._postings.setdefault(gram, set()).add(key_id)
+
+    def lookup(self, key: str, min_score: float = FUZZY_MIN_SCORE) -> Optional[Tuple[str, float]]:
+        """Best (normalized alias, score) for a normalized query, or None."""
+        if not key:
+            return None
+        if min_score <= 0:
+            # every alias scores at least 0, bigrams or not
+            return self._best(key, range(len(self._keys)), min_score)
+        # Each edit changes at most two bigrams, so an alias within `max_edits`
+        # shares a bigram with the 2 * max_edits + 1 rarest ones of the query;
+        # counting only those keeps long posting lists out of the loop.
+        max_edits = int(len(key) * (1 - min_score) / min_score + 1e-9)
+        grams = sorted(set(_bigrams(key)), key=lambda g: len(self._postings.get(g, ())))
+        prefix = 2 * max_edits + 1
+        counts = Counter()
+        for gram in grams[:prefix]:
+            counts.update(self._postings.get(gram, ()))
+        # the remaining grams only add to candidates already found
+        for gram in grams[prefix:]:
+            posting = self._postings.get(gram)
+            if posting:
+                counts.update(posting.intersection(counts))
+
+        # ... and must share all but 2 * max_edits of the query's bigrams
+        needed = len(grams) - 2 * max_edits
+        candidates = [key_id for key_id, n in counts.items() if n >= needed]
+        return self._best(key, candidates, min_score)
+
+    def _best(self, key: str, candidates: Iterable[int], min_score: float) -> Optional[Tuple[str, float]]:
+        best = None
+        best_score = min_score
+        for key_id in candidates:
+            alias = self._keys[key_id]
+            longest = max(len(key), len(alias))
+            limit = _max_edits(longest, best_score)
+            distance = _edit_distance(key, alias, limit)
+            if distance > limit:
+                continue
+            score = 1 - distance / longest
+            if score >= best_score and (best is None or score > best[1]):
+                best = (alias, score)
+                best_score = score
+        return best
+
+
+# ============================================================
+# Registry: namespaces, precedence, snapshots, conflicts
+# ============================================================
+
+class Layer(NamedTuple):
+    """One loaded lexicon file (or table) inside a namespace."""
+    namespace: str
+    source: str
+    precedence: int
+    order: int
+    table: Mapping
+
+
+class Conflict(NamedTuple):
+    """
+    An alias claimed by layers with different intents; `winner` is the one in effect.
+    With `normalized`, `alias` is a normalized form that different aliases
+    (e.g. "Parse" / "parse") share.
+    """
+    alias: str
+    winner: Tuple[str, str, str]  # (intent_id, namespace, source)
+    shadowed: Tuple[Tuple[str, str, str], ...]
+    normalized: bool = False
+
+
+class LexiconSnapshot(Mapping):
+    """
+    Immutable alias → intent view of a registry at one point in time.
+    Safe to share between threads and flows; later registry changes never
+    show up in an existing snapshot.
+    """
+
+    __slots__ = ("_table", "_normalized", "_fuzzy", "namespaces", "conflicts")
+
+    def __init__(self, table: Dict[str, str], namespaces: Tuple[str, ...], conflicts: Tuple[Conflict, ...],
+                 normalized: Optional[Dict[str, Tuple[str, str]]] = None):
+        self._table = MappingProxyType(table)
+        # normalized alias → (intent_id, alias). LexiconRegistry passes one built
+        # in precedence order; otherwise the later alias in `table` wins a collision.
+        if normalized is None:
+            normalized = {}
+            for alias, intent_id in table.items():
+                if isinstance(alias, str):
+                    normalized[normalize_alias(alias)] = (intent_id, alias)
+        self._normalized = normalized
+        self._fuzzy = None  # FuzzyIndex, built on the first fuzzy lookup
+        self.namespaces = namespaces
+        self.conflicts = conflicts
+
+    def resolve(self, word: str, fuzzy: bool = False) -> Optional[str]:
+        intent_id = self._table.get(word)
+        if intent_id is not None:
+            return intent_id
+        match = self.match(word, fuzzy)
+        return match.intent_id if match else None
+
+    def match(self, word: str, fuzzy: bool = False, min_score: float = FUZZY_MIN_SCORE) -> Optional[Match]:
+        """
+        Exact alias (score 1.0), then normalized alias (1.0), then, with
+        `fuzzy`, the closest alias scoring at least `min_score`.
+        """
+        intent_id = self._table.get(word)
+        if intent_id is not None:
+            return Match(intent_id, word, 1.0)
+        if not isinstance(word, str):
+            return None
+        key = normalize_alias(word)
+        hit = self._normalized.get(key)
+        if hit is not None:
+            return Match(hit[0], hit[1], 1.0)
+        if not fuzzy:
+            return None
+        if self._fuzzy is None:
+            self._fuzzy = FuzzyIndex(self._normalized)
+        found = self._fuzzy.lookup(key, min_score)
+        if found is None:
+            return None
+        intent_id, alias = self._normalized[found[0]]
+        return Match(intent_id, alias, found[1])
+
+    def match_many(self, words, fuzzy: bool = False, min_score: float = FUZZY_MIN_SCORE):
+        """
+        Batch form of match(): (intent_ids, scores) as parallel lists, None / 0.0
+        where nothing matched. Exact hits are looked up in one pass; every
+        distinct miss is normalized (and fuzzy-matched) only once.
+        """
+        words = list(words)
+        intents = list(map(self._table.get, words))
+        scores = [1.0 if intent_id is not None else 0.0 for intent_id in intents]
+
+        misses = [i for i, intent_id in enumerate(intents) if intent_id is None]
+        if misses:
+            resolved = {}
+            for word in dict.fromkeys(words[i] for i in misses):
+                resolved[word] = self.match(word, fuzzy, min_score)
+            for i in misses:
+                match = resolved[words[i]]
+                if match is not None:
+                    intents[i] = match.intent_id
+                    scores[i] = match.score
+        return intents, scores
+
+    def __getitem__(self, alias: str) -> str:
+        return self._table[alias]
+
+    def __iter__(self):
+        return iter(self._table)
+
+    def __len__(self) -> int:
+        return len(self._table)
+
+    def __repr__(self) -> str:
+        return f"LexiconSnapshot(namespaces={self.namespaces!r}, aliases={len(self)})"
+
+
+class LexiconRegistry:
+    """
+    Lexicons grouped by namespace (e.g. one per project).
+
+    Each load adds a layer. When layers disagree on an alias, the higher
+    precedence wins; on equal precedence the later load wins (the old
+    load_lexicon behavior). snapshot() merges the selected namespaces into
+    an immutable LexiconSnapshot, cached until the registry changes, so
+    flows using different lexicon sets can run side by side without
+    reloading anything.
+    """
+
+    def __init__(self):
+        self._layers: List[Layer] = []
+        self._snapshots: Dict[Optional[Tuple[str, ...]], LexiconSnapshot] = {}
+        self._lock = threading.Lock()
+
+    def load(self, path: str, namespace: Optional[str] = None, precedence: int = 0) -> Layer:
+        """Load a lexicon file into `namespace` (default: the file name without extension)."""
+        table = _read_compiled(path)
+        if table is None:
+            table = _read_yaml(path)
+        if namespace is None:
+            namespace = os.path.splitext(os.path.basename(path))[0]
+        return self.add(namespace, table, precedence, source=path)
+
+    def add(self, namespace: str, table: Mapping, precedence: int = 0, source: str = "<table>") -> Layer:
+        with self._lock:
+            layer = Layer(namespace, source, precedence, len(self._layers), MappingProxyType(dict(table)))
+            self._layers.append(layer)
+            self._snapshots.clear()
+        return layer
+
+    def remove(self, namespace: str) -> None:
+        """Drop every layer of `namespace`. Existing snapshots are unaffected."""
+        with self._lock:
+            self._layers = [layer for layer in self._layers if layer.namespace != namespace]
+            self._snapshots.clear()
+
+    @property
+    def namespaces(self) -> Tuple[str, ...]:
+        with self._lock:
+            return tuple(dict.fromkeys(layer.namespace for layer in self._layers))
+
+    def snapshot(self, namespaces: Optional[Iterable[str]] = None) -> LexiconSnapshot:
+        """Merged view of `namespaces` (default: all of them)."""
+        key = None if namespaces is None else tuple(namespaces)
+        with self._lock:
+            snap = self._snapshots.get(key)
+            if snap is None:
+                snap = self._build(key)
+                self._snapshots[key] = snap
+            return snap
+
+    def conflicts(self, namespaces: Optional[Iterable[str]] = None) -> Tuple[Conflict, ...]:
+        return self.snapshot(namespaces).conflicts
+
+    def conflict_report(self, namespaces: Optional[Iterable[str]] = None) -> str:
+        lines = []
+        for c in self.conflicts(namespaces):
+            intent_id, namespace, source = c.winner
+            kind = " (normalized)" if c.normalized else ""
+            lines.append(f"{c.alias!r}{kind}: {intent_id} ({namespace}: {source})")
+            for intent_id, namespace, source in c.shadowed:
+                lines.append(f"    shadows {intent_id} ({namespace}: {source})")
+        return "\n".join(lines) if lines else "No lexicon conflicts."
+
+    def _build(self, key: Optional[Tuple[str, ...]]) -> LexiconSnapshot:
+        layers = self._layers if key is None else [l for l in self._layers if l.namespace in key]
+        layers = sorted(layers, key=lambda l: (l.precedence, l.order))
+
+        table: Dict[str, str] = {}
+        owner: Dict[str, Layer] = {}
+        shadowed: Dict[str, List[Layer]] = {}
+        # normalized index, built in the same order so higher layers win it too
+        normalized: Dict[str, Tuple[str, str]] = {}
+        norm_owner: Dict[str, Layer] = {}
+        norm_shadowed: Dict[str, List[Tuple[str, Layer]]] = {}
+        for layer in layers:
+            for alias, intent_id in layer.table.items():
+                prev = owner.get(alias)
+                if prev is not None and prev.table[alias] != intent_id:
+                    shadowed.setdefault(alias, []).append(prev)
+                table[alias] = intent_id
+                owner[alias] = layer
+
+                if not isinstance(alias, str):
+                    continue
+                key = normalize_alias(alias)
+                hit = normalized.get(key)
+                # a different alias with the same normalized form (same alias: counted above)
+                if hit is not None and hit[1] != alias and hit[0] != intent_id:
+                    norm_shadowed.setdefault(key, []).append((hit[0], norm_owner[key]))
+                normalized[key] = (intent_id, alias)
+                norm_owner[key] = layer
+
+        conflicts = []
+        for alias, losers in shadowed.items():
+            losers = [l for l in losers if l.table[alias] != table[alias]]
+            if losers:
+                winner = owner[alias]
+                conflicts.append(Conflict(
+                    alias,
+                    (table[alias], winner.namespace, winner.source),
+                    tuple((l.table[alias], l.namespace, l.source) for l in losers),
+                ))
+        for key, losers in norm_shadowed.items():
+            intent_id = normalized[key][0]
+            losers = [(i, l) for i, l in losers if i != intent_id]
+            if losers:
+                winner = norm_owner[key]
+                conflicts.append(Conflict(
+                    key,
+                    (intent_id, winner.namespace, winner.source),
+                    tuple((i, l.namespace, l.source) for i, l in losers),
+                    normalized=True,
+                ))
+        namespaces = tuple(dict.fromkeys(l.namespace for l in layers))
+        return LexiconSnapshot(table, namespaces, tuple(conflicts), normalized)
+
+
+# Registry behind load_lexicon / resolve_intent
+REGISTRY = LexiconRegistry()
+
+
+def load_lexicon(path, namespace=None, precedence=0):
+    """
+    Load a lexicon file into REGISTRY and refresh LEXICON.
+    Conflicts the file introduces (aliases it maps to another intent than an
+    already loaded lexicon) are logged as warnings and returned.
+    """
+    before = set(REGISTRY.conflicts())
+    REGISTRY.load(path, namespace, precedence)
+    snapshot = REGISTRY.snapshot()
+    LEXICON.clear()
+    LEXICON.update(snapshot)
+
+    new = tuple(c for c in snapshot.conflicts if c not in before)
+    if new and log.enabled(log.WARNING):
+        for c in new:
+            intent_id, winner_ns, winner_source = c.winner
+            shadowed = ", ".join(f"{i} ({ns}: {source})" for i, ns, source in c.shadowed)
+            log.warning(
+                "LEXICON", "%r: %s (%s: %s) shadows %s",
+                c.alias, intent_id, winner_ns, winner_source, shadowed,
+                alias=c.alias, intent=intent_id,
+            )
+    return new
+
+
+def match_intent(word, lexicon=None, fuzzy=False, min_score=FUZZY_MIN_SCORE):
+    """Match against `lexicon` (a LexiconSnapshot) or the global one; see LexiconSnapshot.match."""
+    if lexicon is None:
+        lexicon = REGISTRY.snapshot()
+    if isinstance(lexicon, LexiconSnapshot):
+        return lexicon.match(word, fuzzy, min_score)
+    intent_id = lexicon.get(word)
+    return Match(intent_id, word, 1.0) if intent_id is not None else None
+
+
+def resolve_intent(word, lexicon=None, fuzzy=False):
+    """
+    Intent for `word` in `lexicon` (e.g. a LexiconSnapshot) or the global
+    LEXICON: exact alias first, then normalized (case, width, punctuation),
+    then with `fuzzy` the closest alias.
+    """
+    match = match_intent(word, lexicon, fuzzy)
+    return match.intent_id if match else None
+
+
+def match_intents(words, lexicon=None, fuzzy=False, min_score=FUZZY_MIN_SCORE):
+    """
+    Resolve many words in one call: (intent_ids, scores) as parallel lists,
+    None / 0.0 where nothing matched. Same rules as match_intent.
+    """
+    if lexicon is None:
+        lexicon = REGISTRY.snapshot()
+    if isinstance(lexicon, LexiconSnapshot):
+        return lexicon.match_many(words, fuzzy, min_score)
+    intents = [lexicon.get(word) for word in words]
+    return intents, [1.0 if intent_id is not None else 0.0 for intent_id in intents]
 
 
-def resolve_intent(word):
-    return LEXICON.get(word)
+def resolve_intents(words, lexicon=None, fuzzy=False):
+    """Batch resolve_intent: one intent id (or None) per word, in order."""
+    return match_intents(words, lexicon, fuzzy)[0]
@@ -0,0 +1,123 @@
+# runtime/log.py
+# Runtime logging for capabilities, the engine and the CLI.
+# Messages are %-style templates, formatted only when their level is enabled,
+# so a silenced run pays one comparison per call and no string building.
+#
+#   from runtime import log
+#   log.info("HTTP", "Status: %s", status, status=status)
+#
+# Text sink (default): "[HTTP] Status: 200" on the current sys.stdout.
+# JSON sink: {"ts", "level", "tag", "msg", **fields} per line on stderr or a file.
+
+import json
+import sys
+import threading
+import time
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+OFF = 100
+
+LEVELS = {"debug": DEBUG, "info": INFO, "warning": WARNING, "error": ERROR, "off": OFF}
+LEVEL_NAMES = {number: name for name, number in LEVELS.items()}
+
+
+class TextSink:
+    """`[TAG] message` lines; `stream` defaults to sys.stdout as it is at emit time."""
+
+    def __init__(self, stream=None):
+        self.stream = stream
+
+    def emit(self, level, tag, message, fields) -> None:
+        stream = self.stream or sys.stdout
+        stream.write(f"[{tag}] {message}\n" if tag else f"{message}\n")
+
+
+class JsonSink:
+    """One JSON object per message; `stream` defaults to sys.stderr as it is at emit time."""
+
+    def __init__(self, stream=None):
+        self.stream = stream
+        self._lock = threading.Lock()
+
+    def emit(self, level, tag, message, fields) -> None:
+        record = {"ts": round(time.time(), 6), "level": LEVEL_NAMES.get(level, level), "tag": tag, "msg": message}
+        record.update(fields)
+        line = json.dumps(record, ensure_ascii=False, default=repr) + "\n"
+        stream = self.stream or sys.stderr
+        with self._lock:
+            stream.write(line)
+            stream.flush()
+
+
+_level = INFO
+_sink = TextSink()
+_json_format = False  # as passed to configure, so settings() can be replayed in another process
+_file = None  # the file configure opened for the JSON sink, closed when the sink is replaced
+
+
+def configure(level=None, json_format=None) -> None:
+    """
+    level:       a name ("debug", "info", "warning", "error", "off") or a number.
+    json_format: None keeps the current sink, False writes text lines to stdout,
+                 "-" writes JSON lines to stderr, any other string is a file that
+                 JSON lines are appended to.
+    """
+    global _level, _sink, _json_format, _file
+    if level is not None:
+        if isinstance(level, str):
+            if level.lower() not in LEVELS:
+                raise ValueError(f"Unknown log level: {level}. Use {'|'.join(LEVELS)}")
+            level = LEVELS[level.lower()]
+        _level = level
+    if json_format is not None:
+        opened = None
+        if json_format is False:
+            sink = TextSink()
+        elif json_format == "-":
+            sink = JsonSink()
+        else:
+            opened = open(json_format, "a", encoding="utf-8")
+            sink = JsonSink(opened)
+        previous = _file
+        _sink, _file, _json_format = sink, opened, json_format
+        if previous is not None:
+            previous.close()
+
+
+def settings() -> dict:
+    """The current configuration, as keyword arguments for configure()."""
+    return {"level": _level, "json_format": _json_format}
+
+
+def enabled(level: int) -> bool:
+    """True when messages at `level` are emitted (guard for expensive arguments)."""
+    return level >= _level
+
+
+def log(level: int, tag, msg: str, *args, **fields) -> None:
+    if level < _level:
+        return
+    _sink.emit(level, tag, msg % args if args else msg, fields)
+
+
+def debug(tag, msg: str, *args, **fields) -> None:
+    if DEBUG >= _level:
+        _sink.emit(DEBUG, tag, msg % args if args else msg, fields)
+
+
+def info(tag, msg: str, *args, **fields) -> None:
+    if INFO >= _level:
+        _sink.emit(INFO, tag, msg % args if args else msg, fields)
+
+
+def warning(tag, msg: str, *args, **fields) -> None:
+    if WARNING >= _level:
+        _sink.emit(WARNING, tag, msg % args if args else msg, fields)
+
+
+def error(tag, msg: str, *args, **fields) -> None:
+    if ERROR >= _level:
+        _sink.emit(ERROR, tag, msg % args if args else msg, fields)
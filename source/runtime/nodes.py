@@ -1,9 +1,18 @@
 # runtime/nodes.py
 
+import inspect
+
 CAPABILITIES = {}
 
+# Intents whose capability is a coroutine function (async def)
+ASYNC_CAPABILITIES = set()
+
 def capability(intent_id):
     def deco(fn):
         CAPABILITIES[intent_id] = fn
+        if inspect.iscoroutinefunction(fn):
+            ASYNC_CAPABILITIES.add(intent_id)
+        else:
+            ASYNC_CAPABILITIES.discard(intent_id)
         return fn
     return deco
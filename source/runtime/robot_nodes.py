@@ -1,6 +1,7 @@
+from runtime import log
 from runtime.nodes import capability
 from runtime.intents import *
-from runtime.lexicon_loader import resolve_intent
+from runtime.lexicon_loader import match_intent, match_intents
 
 
 # 1️⃣ INPUT NODE
@@ -9,7 +10,7 @@ from runtime.lexicon_loader import resolve_intent
 @capability(INTENT_INPUT)
 def node_input(ctx):
     text = ctx.get("input", "")
-    print("[INPUT] Received:", text)
+    log.info("INPUT", "Received: %s", text)
     return {"text": text}
 
 
@@ -19,29 +20,50 @@ def node_input(ctx):
 @capability(INTENT_PARSE)
 def node_parse(ctx):
     text = ctx.get("text", "")
-    print("[PARSE] Processing text")
+    log.info("PARSE", "Processing text")
 
-    resolved = resolve_intent(text)
+    # ctx["lexicon"]: optional per-flow LexiconSnapshot
+    # ctx["fuzzy_intent"]: also accept near-miss aliases (scored below 1.0)
+    match = match_intent(text, ctx.get("lexicon"), fuzzy=ctx.get("fuzzy_intent", False))
 
-    if resolved:
-        print("[PARSE] Resolved intent:", resolved)
+    if match:
+        log.info("PARSE", "Resolved intent: %s", match.intent_id, intent=match.intent_id, score=match.score)
         return {
             "parsed_text": text,
-            "resolved_intent": resolved
+            "resolved_intent": match.intent_id,
+            "intent_score": match.score
         }
     else:
-        print("[PARSE] No intent matched")
+        log.info("PARSE", "No intent matched")
         return {
             "parsed_text": text,
-            "resolved_intent": None
+            "resolved_intent": None,
+            "intent_score": 0.0
         }
 
+# 2️⃣b PARSE BATCH NODE
+# Same as PARSE for a list of texts (ctx["texts"]), resolved in one call.
+@capability(INTENT_PARSE_BATCH)
+def node_parse_batch(ctx):
+    texts = list(ctx.get("texts", []))
+    log.info("PARSE_BATCH", "Processing %d text(s)", len(texts))
+
+    intents, scores = match_intents(texts, ctx.get("lexicon"), fuzzy=ctx.get("fuzzy_intent", False))
+
+    matched = sum(1 for intent_id in intents if intent_id)
+    log.info("PARSE_BATCH", "Resolved %d/%d", matched, len(texts))
+    return {
+        "parsed_texts": texts,
+        "resolved_intents": intents,
+        "intent_scores": scores
+    }
+
 # 3️⃣ DECIDE NODE
 # Delegates decision-making to the router.
 # Does not branch internally.
 @capability(INTENT_DECIDE)
 def node_decide(ctx):
-    print("[DECIDE] Passing control to router")
+    log.info("DECIDE", "Passing control to router")
     return ctx
 
 
@@ -51,7 +73,7 @@ def node_decide(ctx):
 @capability(INTENT_ACTION)
 def node_action(ctx):
     action = ctx.get("action", "undefined")
-    print(f"[ACTION] Executing action: {action}")
+    log.info("ACTION", "Executing action: %s", action)
     return ctx
 
 
@@ -60,5 +82,5 @@ def node_action(ctx):
 # Used to signal completion or return output.
 @capability(INTENT_FEEDBACK)
 def node_feedback(ctx):
-    print("[FEEDBACK] Flow completed")
+    log.info("FEEDBACK", "Flow completed")
     return ctx
@@ -1,39 +1,49 @@
 from runtime.intents import *
+from runtime.transitions import TransitionTable
+
+
+def _decided_intent(ctx):
+    """DECIDE → resolved intent (must be set in ctx), else FEEDBACK."""
+    next_intent = ctx.get("resolved_intent")
+
+    if next_intent and next_intent != INTENT_DECIDE:
+        return next_intent
+
+    return INTENT_FEEDBACK
+
 
 class Router:
     """
     Router decides the next intent based on current intent and context.
     It does NOT inspect raw text.
     It only works with Intent IDs.
+
+    The routes live in a TransitionTable, so route() is a dict lookup.
     """
 
-    def route(self, current_intent, ctx):
-        """
-        Returns the next Intent ID or None to stop execution.
-        """
+    def __init__(self):
+        self.table = TransitionTable()
 
         # INPUT → PARSE
-        if current_intent == INTENT_INPUT:
-            return INTENT_PARSE
+        self.table.add(INTENT_INPUT, INTENT_PARSE)
 
         # PARSE → DECIDE
-        if current_intent == INTENT_PARSE:
-            return INTENT_DECIDE
+        self.table.add(INTENT_PARSE, INTENT_DECIDE)
 
-        # DECIDE → resolved intent (must be set in ctx)
-        if current_intent == INTENT_DECIDE:
-            next_intent = ctx.get("resolved_intent")
+        # PARSE_BATCH → FEEDBACK (many intents, nothing single to decide on)
+        self.table.add(INTENT_PARSE_BATCH, INTENT_FEEDBACK)
 
-            if next_intent and next_intent != INTENT_DECIDE:
-                return next_intent
+        # DECIDE → resolved intent (must be set in ctx)
+        self.table.add(INTENT_DECIDE, _decided_intent)
 
-            return INTENT_FEEDBACK
         # ACTION → FEEDBACK
-        if current_intent == INTENT_ACTION:
-            return INTENT_FEEDBACK
+        self.table.add(INTENT_ACTION, INTENT_FEEDBACK)
 
         # FEEDBACK → END (stop execution)
-        if current_intent == INTENT_FEEDBACK:
-            return None
+        self.table.add(INTENT_FEEDBACK, None)
 
-        return None
+    def route(self, current_intent, ctx):
+        """
+        Returns the next Intent ID or None to stop execution.
+        """
+        return self.table.next(current_intent, ctx)
@@ -1,31 +1,25 @@
 # runtime/router_api.py
 
 from runtime.intents import *
+from runtime.transitions import TransitionTable
 
-class ApiRouter:
-
-    def route(self, current_intent, ctx):
-        status = ctx.get("status_code", None)
-
-        if current_intent == INTENT_INPUT:
-            return INTENT_PARSE_URL
 
-        if current_intent == INTENT_PARSE_URL:
-            return INTENT_HTTP_REQUEST
+def _status_ok(ctx):
+    status = ctx.get("status_code", None)
+    return bool(status and 200 <= status < 300)
 
-        if current_intent == INTENT_HTTP_REQUEST:
-            if status and 200 <= status < 300:
-                return INTENT_HANDLE_SUCCESS
-            else:
-                return INTENT_HANDLE_ERROR
 
-        if current_intent == INTENT_HANDLE_SUCCESS:
-            return INTENT_EXTRACT_DATA
-
-        if current_intent == INTENT_EXTRACT_DATA:
-            return INTENT_OUTPUT_SUCCESS
+class ApiRouter:
 
-        if current_intent == INTENT_HANDLE_ERROR:
-            return INTENT_OUTPUT_ERROR
+    def __init__(self):
+        self.table = TransitionTable()
+        self.table.add(INTENT_INPUT, INTENT_PARSE_URL)
+        self.table.add(INTENT_PARSE_URL, INTENT_HTTP_REQUEST)
+        self.table.add(INTENT_HTTP_REQUEST, INTENT_HANDLE_SUCCESS, guard=_status_ok)
+        self.table.add(INTENT_HTTP_REQUEST, INTENT_HANDLE_ERROR)
+        self.table.add(INTENT_HANDLE_SUCCESS, INTENT_EXTRACT_DATA)
+        self.table.add(INTENT_EXTRACT_DATA, INTENT_OUTPUT_SUCCESS)
+        self.table.add(INTENT_HANDLE_ERROR, INTENT_OUTPUT_ERROR)
 
-        return None
+    def route(self, current_intent, ctx):
+        return self.table.next(current_intent, ctx)
@@ -0,0 +1,87 @@
+# runtime/transitions.py
+# Precomputed transition tables: one dict lookup per step instead of if-chains.
+# Used by Router / ApiRouter and by flows compiled from .cat arrows
+# (mapper/flow_mapper.map_program_to_transitions).
+
+_NO_EDGES = ((), None)
+
+
+def ctx_ok(ctx) -> bool:
+    """
+    Outcome of the last step, used by `!` (ok) / `?` (not ok) edges:
+    ctx["ok"] when a node sets it, else an HTTP status in 2xx, else whether
+    an intent was resolved.
+    """
+    if "ok" in ctx:
+        return bool(ctx["ok"])
+    status = ctx.get("status_code")
+    if status is not None:
+        return bool(status) and 200 <= status < 300
+    return bool(ctx.get("resolved_intent"))
+
+
+def ctx_not_ok(ctx) -> bool:
+    return not ctx_ok(ctx)
+
+
+# Named edge conditions → guards
+GUARDS = {
+    "ok": ctx_ok,
+    "not_ok": ctx_not_ok,
+}
+
+# Line state → condition of edges written with it (others are unconditional)
+BRANCH_CONDITIONS = {
+    "!": "ok",
+    "?": "not_ok",
+}
+
+
+class TransitionTable:
+    """
+    intent → (guarded edges, default target).
+
+    next() checks the guarded edges of the current intent in order and
+    falls back to the default; a target is an intent id, None (stop) or a
+    callable(ctx) returning one. Intents without an entry stop the flow.
+    """
+
+    __slots__ = ("_table", "entry")
+
+    def __init__(self, entry=None):
+        self._table = {}
+        self.entry = entry
+
+    def add(self, source, target, guard=None) -> None:
+        """
+        Add an edge. Guarded edges are tried in the order they were added;
+        the first unguarded edge from a source is its default.
+        """
+        edges, default = self._table.get(source, _NO_EDGES)
+        if guard is not None:
+            edges += ((guard, target),)
+        elif default is None:
+            default = target
+        self._table[source] = (edges, default)
+
+    def next(self, current, ctx):
+        edges, default = self._table.get(current, _NO_EDGES)
+        for guard, target in edges:
+            if guard(ctx):
+                return target(ctx) if callable(target) else target
+        return default(ctx) if callable(default) else default
+
+    def targets(self, source):
+        """Every possible static target of `source` (callables excluded)."""
+        edges, default = self._table.get(source, _NO_EDGES)
+        out = [target for _, target in edges] + [default]
+        return [target for target in out if target is not None and not callable(target)]
+
+    def __contains__(self, source) -> bool:
+        return source in self._table
+
+    def __len__(self) -> int:
+        return len(self._table)
+
+    def __repr__(self) -> str:
+        return f"TransitionTable(entry={self.entry!r}, intents={len(self)})"
@@ -0,0 +1,95 @@
+# tests/http_stub.py
+# Local keep-alive HTTP server for the runtime HTTP tests.
+#
+#   /ok              200 "hello"
+#   /flaky/<name>    503 on the first request to that path, then 200
+#   /down            always 503
+#   /slow            200 after 0.5s
+#   /big             200, 1 MB of "y"
+#   /utf8            200, "é" * 50 (utf-8)
+#   /etag?cc=<...>   200 with ETag "v1" and Cache-Control <cc>; 304 for If-None-Match: "v1"
+
+import sys
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+BIG_SIZE = 1_000_000
+
+
+class _QuietServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # clients that stop reading early (streaming caps) reset the connection
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class StubServer:
+    def __init__(self):
+        self.hits = Counter()  # path (without query) -> requests seen
+        self.conditional = Counter()  # path -> requests that carried If-None-Match
+        self._lock = threading.Lock()
+        self._httpd = _QuietServer(("127.0.0.1", 0), _handler_for(self))
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+
+    def url(self, path: str) -> str:
+        return f"http://127.0.0.1:{self._httpd.server_address[1]}{path}"
+
+    def close(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def _count(self, path: str, conditional: bool) -> int:
+        with self._lock:
+            self.hits[path] += 1
+            if conditional:
+                self.conditional[path] += 1
+            return self.hits[path]
+
+
+def _handler_for(server: StubServer):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            parts = urlsplit(self.path)
+            path = parts.path
+            etag = self.headers.get("If-None-Match")
+            n = server._count(path, etag is not None)
+
+            if path == "/down" or (path.startswith("/flaky/") and n == 1):
+                return self._send(503, b"")
+            if path == "/slow":
+                time.sleep(0.5)
+                return self._send(200, b"slow")
+            if path == "/big":
+                return self._send(200, b"y" * BIG_SIZE)
+            if path == "/utf8":
+                return self._send(200, ("é" * 50).encode("utf-8"), {"Content-Type": "text/plain; charset=utf-8"})
+            if path == "/etag":
+                headers = {"ETag": '"v1"', "Cache-Control": parse_qs(parts.query).get("cc", ["max-age=60"])[0]}
+                if etag == '"v1"':
+                    return self._send(304, b"", headers)
+                return self._send(200, f"body of {self.path}".encode("utf-8"), headers)
+            return self._send(200, b"hello")
+
+        def _send(self, status, body, headers=None):
+            self.send_response(status)
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            try:
+                self.wfile.write(body)
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # the client stopped reading (streaming caps)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
@@ -0,0 +1,60 @@
+# tests/test_ast_cache.py
+# AstCache: memory hits, the marshalled disk store, and untrusted disk entries.
+
+import glob
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from parser.ast_cache import AstCache
+from parser.parser import parse_file
+
+EXAMPLE = os.path.join(ROOT, "examples", "m1_features.cat")
+
+
+class _Boom:
+    def __reduce__(self):
+        return (os.system, ("exit 1",))
+
+
+class AstCacheTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.disk_dir = os.path.join(tmp.name, "ast")
+        self.path = os.path.join(tmp.name, "prog.cat")
+        shutil.copy(EXAMPLE, self.path)
+
+    def test_memory_hit(self):
+        cache = AstCache()
+        first = cache.parse(self.path)
+        self.assertIs(cache.parse(self.path), first)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_disk_store_round_trip(self):
+        AstCache(disk_dir=self.disk_dir).parse(self.path)
+        other = AstCache(disk_dir=self.disk_dir)
+        ast = other.parse(self.path)
+        self.assertEqual((other.hits, other.misses), (1, 0))
+        self.assertEqual(ast.to_dict(), parse_file(self.path).to_dict())
+
+    def test_untrusted_disk_entry_is_reparsed(self):
+        AstCache(disk_dir=self.disk_dir).parse(self.path)
+        [entry] = glob.glob(os.path.join(self.disk_dir, "*.ast"))
+        with open(entry, "wb") as f:
+            pickle.dump((2, _Boom()), f)
+        cache = AstCache(disk_dir=self.disk_dir)
+        ast = cache.parse(self.path)
+        self.assertEqual((cache.hits, cache.misses), (0, 1))
+        self.assertEqual(ast.to_dict(), parse_file(self.path).to_dict())
+
+
+if __name__ == "__main__":
+    unittest.main()
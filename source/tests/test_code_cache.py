@@ -0,0 +1,47 @@
+# tests/test_code_cache.py
+# __catcache__ entries for --exec: round trip, key mismatch, parse warnings.
+
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from mapper import code_cache
+
+
+class CodeCacheTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "prog.cat")
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write("印 hello\n")
+        self.key = code_cache.source_key(b"print hello", "python")
+        self.code = compile("x = 1", "<string>", "exec")
+
+    def test_round_trip_keeps_warnings(self):
+        with mock.patch.object(sys, "dont_write_bytecode", False):
+            code_cache.store(self.path, self.key, "x = 1", self.code, ["inline comment [line 1]"])
+        py_code, code, parse_warnings = code_cache.load(self.path, self.key)
+        self.assertEqual(py_code, "x = 1")
+        self.assertEqual(code, self.code)
+        self.assertEqual(parse_warnings, ["inline comment [line 1]"])
+
+    def test_other_key_misses(self):
+        with mock.patch.object(sys, "dont_write_bytecode", False):
+            code_cache.store(self.path, self.key, "x = 1", self.code)
+        self.assertIsNone(code_cache.load(self.path, "other"))
+
+    def test_dont_write_bytecode(self):
+        with mock.patch.object(sys, "dont_write_bytecode", True):
+            code_cache.store(self.path, self.key, "x = 1", self.code)
+        self.assertFalse(os.path.exists(code_cache.cache_path(self.path)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+# tests/test_flow_graph.py
+# FlowGraph.to_transitions: entry selection when the entry word has no intent.
+
+import os
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from mapper.flow_mapper import FlowGraph
+
+
+class ToTransitionsEntryTest(unittest.TestCase):
+    def test_resolved_entry(self):
+        graph = FlowGraph()
+        a, b = graph.node("a", "INTENT_A"), graph.node("b", "INTENT_B")
+        graph.add_edge(a, b, None, None)
+        graph.entry = a
+        self.assertEqual(graph.to_transitions().entry, "INTENT_A")
+
+    def test_unresolved_entry_uses_first_reachable_intent(self):
+        graph = FlowGraph()
+        graph.node("other", "INTENT_OTHER")  # earlier in node order, not reachable
+        start = graph.node("start", None)
+        a = graph.node("a", "INTENT_A")
+        graph.add_edge(start, a, None, None)
+        graph.entry = start
+        self.assertEqual(graph.to_transitions().entry, "INTENT_A")
+
+    def test_unreachable_intents_fall_back_to_node_order(self):
+        graph = FlowGraph()
+        start = graph.node("start", None)
+        graph.node("x", None)
+        graph.node("b", "INTENT_B")
+        graph.entry = start
+        self.assertEqual(graph.to_transitions().entry, "INTENT_B")
+
+    def test_no_intents(self):
+        graph = FlowGraph()
+        graph.entry = graph.node("start", None)
+        self.assertIsNone(graph.to_transitions().entry)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+# tests/test_fuzzy_index.py
+# FuzzyIndex.lookup against a brute-force scan of every alias.
+
+import os
+import random
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from runtime.lexicon_loader import FuzzyIndex, _edit_distance
+
+
+def _brute_force(keys, query, min_score):
+    best = None
+    for key in keys:
+        longest = max(len(query), len(key))
+        score = 1 - _edit_distance(query, key, longest) / longest
+        if score >= min_score and (best is None or score > best):
+            best = score
+    return best
+
+
+class FuzzyIndexTest(unittest.TestCase):
+    def test_closer_alias_with_fewer_shared_bigrams(self):
+        rnd = random.Random(7)
+        crowd = ["dgbd" + "".join(rnd.choice("aceg") for _ in range(4)) for _ in range(40)]
+        self.assertEqual(FuzzyIndex(["dxbd"] + crowd).lookup("dgbd"), ("dxbd", 0.75))
+
+    def test_matches_brute_force(self):
+        rnd = random.Random(1)
+
+        def word():
+            return "".join(rnd.choice("abcdeg") for _ in range(rnd.randint(1, 10)))
+
+        keys = sorted({word() for _ in range(400)})
+        index = FuzzyIndex(keys)
+        for min_score in (0.5, 0.6, 0.7, 0.75, 0.8, 0.9):
+            for _ in range(40):
+                query = word()
+                found = index.lookup(query, min_score)
+                self.assertEqual(found and found[1], _brute_force(keys, query, min_score), (query, min_score))
+
+    def test_non_positive_min_score(self):
+        index = FuzzyIndex(["abc", "xyz"])
+        self.assertEqual(index.lookup("abc", 0), ("abc", 1.0))
+        self.assertEqual(index.lookup("qq", 0), ("abc", 0.0))
+        self.assertEqual(index.lookup("qq", -1), ("abc", 0.0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,137 @@
+# tests/test_http_cache.py
+# ResponseCache against a local stub server: freshness, revalidation, LRU, disk store.
+
+import os
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (ROOT, os.path.join(ROOT, "tests")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from http_stub import StubServer
+from runtime import log
+from runtime.api_nodes import node_http_request
+from runtime.http_cache import ResponseCache
+from runtime.http_client import HttpClient
+
+
+class ResponseCacheTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = StubServer()
+        cls.client = HttpClient()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.client.close()
+        cls.server.close()
+
+    def setUp(self):
+        settings = log.settings()
+        log.configure(level="off")
+        self.addCleanup(log.configure, **settings)
+
+    def url(self, name, cc="max-age=60"):
+        # distinct query per test, so the server's counters are per test
+        return self.server.url(f"/etag?cc={cc}&t={name}")
+
+    def test_fresh_entry_is_served_from_memory(self):
+        cache = ResponseCache()
+        url = self.url("fresh")
+        status, body, info = cache.fetch(self.client, url)
+        self.assertEqual((status, info["cache"]), (200, "miss"))
+        before = self.server.hits["/etag"]
+
+        status, cached, info = cache.fetch(self.client, url)
+        self.assertEqual((status, cached, info["cache"]), (200, body, "hit"))
+        self.assertEqual(self.server.hits["/etag"], before)
+        self.assertEqual(cache.stats()["hits"], 1)
+        self.assertEqual(cache.stats()["misses"], 1)
+
+    def test_no_cache_is_revalidated_with_etag(self):
+        cache = ResponseCache()
+        url = self.url("reval", cc="no-cache")
+        _, body, _ = cache.fetch(self.client, url)
+        conditional = self.server.conditional["/etag"]
+
+        status, cached, info = cache.fetch(self.client, url)
+        self.assertEqual((status, cached, info["cache"]), (200, body, "revalidated"))
+        self.assertEqual(self.server.conditional["/etag"], conditional + 1)
+        self.assertEqual(cache.stats()["revalidated"], 1)
+
+    def test_expired_entry_is_revalidated(self):
+        cache = ResponseCache()
+        url = self.url("expired", cc="max-age=0")
+        cache.fetch(self.client, url)
+        _, _, info = cache.fetch(self.client, url)
+        self.assertEqual(info["cache"], "revalidated")
+
+    def test_no_store_is_never_cached(self):
+        cache = ResponseCache()
+        url = self.url("nostore", cc="no-store")
+        cache.fetch(self.client, url)
+        _, _, info = cache.fetch(self.client, url)
+        self.assertEqual(info["cache"], "miss")
+        self.assertEqual(cache.stats()["entries"], 0)
+
+    def test_lru_evicts_least_recently_used(self):
+        cache = ResponseCache(maxsize=2)
+        a, b, c = self.url("lru-a"), self.url("lru-b"), self.url("lru-c")
+        cache.fetch(self.client, a)
+        cache.fetch(self.client, b)
+        cache.fetch(self.client, a)  # a is now the most recent
+        cache.fetch(self.client, c)  # evicts b
+
+        self.assertEqual(cache.fetch(self.client, a)[2]["cache"], "hit")
+        self.assertEqual(cache.fetch(self.client, b)[2]["cache"], "miss")
+
+    def test_disk_store_survives_a_new_cache(self):
+        with tempfile.TemporaryDirectory() as disk_dir:
+            url = self.url("disk")
+            _, body, _ = ResponseCache(disk_dir=disk_dir).fetch(self.client, url)
+            status, cached, info = ResponseCache(disk_dir=disk_dir).fetch(self.client, url)
+        self.assertEqual((status, cached, info["cache"]), (200, body, "hit"))
+
+    def test_invalidate_clears_disk_store(self):
+        with tempfile.TemporaryDirectory() as disk_dir:
+            one, two = self.url("inv-one"), self.url("inv-two")
+            cache = ResponseCache(disk_dir=disk_dir)
+            cache.fetch(self.client, one)
+            cache.fetch(self.client, two)
+            other = os.path.join(disk_dir, "notes.txt")
+            open(other, "w").close()
+
+            cache.invalidate(one)
+            fresh = ResponseCache(disk_dir=disk_dir)
+            self.assertEqual(fresh.fetch(self.client, one)[2]["cache"], "miss")
+            self.assertEqual(fresh.fetch(self.client, two)[2]["cache"], "hit")
+
+            cache.invalidate()
+            self.assertEqual(cache.stats()["entries"], 0)
+            fresh = ResponseCache(disk_dir=disk_dir)
+            self.assertEqual(fresh.fetch(self.client, one)[2]["cache"], "miss")
+            self.assertEqual(fresh.fetch(self.client, two)[2]["cache"], "miss")
+            self.assertTrue(os.path.exists(other))
+
+    def test_truncated_body_is_not_stored(self):
+        cache = ResponseCache()
+        url = self.server.url("/big")
+        _, body, _ = cache.fetch(self.client, url, max_body=100)
+        self.assertEqual(len(body), 100)
+        self.assertEqual(cache.fetch(self.client, url, max_body=100)[2]["cache"], "miss")
+
+    def test_node_reports_cache_counters(self):
+        ctx = {"url": self.url("node"), "http_client": self.client, "http_cache": ResponseCache()}
+        first = node_http_request(dict(ctx))
+        second = node_http_request(dict(ctx))
+        self.assertEqual(first["http_cache_status"], "miss")
+        self.assertEqual(second["http_cache_status"], "hit")
+        self.assertEqual((second["http_cache_hits"], second["http_cache_misses"]), (1, 1))
+        self.assertEqual(second["response_body"], first["response_body"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,154 @@
+# tests/test_http_client.py
+# HttpClient against a local stub server: pooling, retries, timeouts, streamed bodies.
+
+import os
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (ROOT, os.path.join(ROOT, "tests")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+import requests
+
+from http_stub import BIG_SIZE, StubServer
+from runtime import log
+from runtime.api_nodes import _response_body, node_http_request
+from runtime.http_client import HttpClient, HttpConfig
+
+
+class StubServerCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = StubServer()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.close()
+
+    def client(self, **settings):
+        client = HttpClient(HttpConfig(**settings))
+        self.addCleanup(client.close)
+        return client
+
+
+class HttpClientTest(StubServerCase):
+    def test_keep_alive_connection_is_reused(self):
+        client = self.client()
+        resp, first = client.get(self.server.url("/ok"))
+        self.assertEqual((resp.status_code, resp.text), (200, "hello"))
+        _, second = client.get(self.server.url("/ok"))
+
+        self.assertFalse(first["connection_reused"])
+        self.assertTrue(second["connection_reused"])
+        metrics = client.metrics.snapshot()
+        self.assertEqual(metrics["requests"], 2)
+        self.assertEqual(metrics["connections_reused"], 1)
+        self.assertEqual(metrics["errors"], 0)
+
+    def test_retry_status_is_retried(self):
+        client = self.client(retries=2, backoff=0)
+        resp, _ = client.get(self.server.url("/flaky/retry"))
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(self.server.hits["/flaky/retry"], 2)
+
+    def test_retries_exhausted_returns_last_status(self):
+        client = self.client(retries=1, backoff=0)
+        before = self.server.hits["/down"]
+        resp, _ = client.get(self.server.url("/down"))
+        self.assertEqual(resp.status_code, 503)
+        self.assertEqual(self.server.hits["/down"] - before, 2)
+
+    def test_no_retries(self):
+        client = self.client(retries=0)
+        resp, _ = client.get(self.server.url("/flaky/once"))
+        self.assertEqual(resp.status_code, 503)
+
+    def test_timeout_raises_and_counts_error(self):
+        client = self.client(retries=0, timeout=0.1)
+        with self.assertRaises(requests.exceptions.RequestException):
+            client.get(self.server.url("/slow"))
+        self.assertEqual(client.metrics.snapshot()["errors"], 1)
+
+    def test_per_request_timeout_overrides_config(self):
+        client = self.client(retries=0, timeout=0.1)
+        resp, _ = client.get(self.server.url("/slow"), timeout=5)
+        self.assertEqual(resp.text, "slow")
+
+
+
+class ResponseStreamTest(StubServerCase):
+    def setUp(self):
+        settings = log.settings()
+        log.configure(level="off")
+        self.addCleanup(log.configure, **settings)
+
+    def test_body_is_capped(self):
+        client = self.client()
+        _, _, stream = client.stream(self.server.url("/big"), max_body=10_000)
+        self.assertEqual(stream.read(), "y" * 10_000)
+        self.assertTrue(stream.truncated)
+        self.assertTrue(stream.closed)
+        self.assertEqual(stream.bytes_read, 10_000)
+
+    def test_early_stop_leaves_the_rest_unread(self):
+        client = self.client(chunk_size=1024)
+        _, _, stream = client.stream(self.server.url("/big"))
+        self.assertEqual(stream.read(100), "y" * 100)
+        self.assertFalse(stream.closed)
+        stream.close()
+        self.assertTrue(stream.closed)
+        self.assertFalse(stream.truncated)
+        self.assertLess(stream.bytes_read, BIG_SIZE)
+
+    def test_whole_body_without_cap(self):
+        client = self.client()
+        _, _, stream = client.stream(self.server.url("/big"))
+        self.assertEqual(len(stream.read()), BIG_SIZE)
+        self.assertTrue(stream.closed)
+        self.assertFalse(stream.truncated)
+
+    def test_multibyte_text_split_across_chunks(self):
+        client = self.client(chunk_size=3)
+        _, _, stream = client.stream(self.server.url("/utf8"))
+        self.assertEqual(stream.read(), "é" * 50)
+
+    def test_node_caps_response_body(self):
+        client = self.client()
+        ctx = {"url": self.server.url("/big"), "http_client": client, "http_max_body": 1000}
+        result = node_http_request(ctx)
+        self.assertEqual(result["status_code"], 200)
+        self.assertEqual(result["response_body"], "y" * 1000)
+
+    def test_node_hands_over_stream(self):
+        client = self.client()
+        ctx = {"url": self.server.url("/big"), "http_client": client, "http_stream": True}
+        result = node_http_request(ctx)
+        stream = result["response_stream"]
+        self.assertNotIn("response_body", result)
+        self.assertEqual(stream.read(5), "yyyyy")
+        stream.close()
+
+    def test_later_request_replaces_stream(self):
+        client = self.client()
+        ctx = {"url": self.server.url("/big"), "http_client": client, "http_stream": True}
+        ctx.update(node_http_request(ctx))
+        stream = ctx["response_stream"]
+
+        ctx.update(url=self.server.url("/ok"), http_stream=False)
+        ctx.update(node_http_request(ctx))
+        self.assertTrue(stream.closed)
+        self.assertNotIn("response_stream", ctx)
+        self.assertEqual(_response_body(ctx), "hello")
+
+        ctx.update(url=self.server.url("/big"), http_stream=True)
+        ctx.update(node_http_request(ctx))
+        ctx.update(url="http://127.0.0.1:9/", http_stream=False)  # nothing listens there
+        ctx.update(node_http_request(ctx))
+        self.assertEqual(ctx["status_code"], 0)
+        self.assertEqual(_response_body(ctx), ctx["response_body"])
+
+
+if __name__ == "__main__":
+    unittest.main()
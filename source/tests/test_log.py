@@ -0,0 +1,60 @@
+# tests/test_log.py
+# runtime.log: configure() sinks and settings() round trip.
+
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from runtime import log
+
+
+class ConfigureTest(unittest.TestCase):
+    def setUp(self):
+        settings = log.settings()
+        self.addCleanup(log.configure, **settings)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+
+    def read(self, name):
+        with open(os.path.join(self.dir, name), encoding="utf-8") as f:
+            return [json.loads(line) for line in f]
+
+    def test_json_file_sink(self):
+        path = os.path.join(self.dir, "a.jsonl")
+        log.configure(level="info", json_format=path)
+        log.info("HTTP", "Status: %s", 200, status=200)
+        log.debug("HTTP", "hidden")
+        self.assertEqual(log.settings(), {"level": log.INFO, "json_format": path})
+        [record] = self.read("a.jsonl")
+        self.assertEqual((record["tag"], record["msg"], record["status"]), ("HTTP", "Status: 200", 200))
+
+    def test_replacing_file_sink_closes_previous_file(self):
+        first = os.path.join(self.dir, "a.jsonl")
+        log.configure(level="info", json_format=first)
+        handle = log._file
+        log.configure(json_format=os.path.join(self.dir, "b.jsonl"))
+        self.assertTrue(handle.closed)
+        log.info("X", "to b")
+        log.configure(json_format=False)
+        self.assertIsNone(log._file)
+        self.assertEqual([r["msg"] for r in self.read("b.jsonl")], ["to b"])
+
+    def test_failed_open_keeps_current_sink(self):
+        path = os.path.join(self.dir, "a.jsonl")
+        log.configure(level="info", json_format=path)
+        with self.assertRaises(OSError):
+            log.configure(json_format=os.path.join(self.dir, "missing", "b.jsonl"))
+        log.info("X", "still a")
+        self.assertEqual(log.settings()["json_format"], path)
+        self.assertEqual([r["msg"] for r in self.read("a.jsonl")], ["still a"])
+
+
+if __name__ == "__main__":
+    unittest.main()
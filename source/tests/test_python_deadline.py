@@ -0,0 +1,46 @@
+# tests/test_python_deadline.py
+# The SIGALRM deadline around python-mode batch jobs (tools/catapillar.py).
+
+import os
+import signal
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (ROOT, os.path.join(ROOT, "tools")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+import catapillar
+
+
+@unittest.skipUnless(hasattr(signal, "setitimer"), "needs SIGALRM")
+class PythonDeadlineTest(unittest.TestCase):
+    def setUp(self):
+        self.handler = lambda signum, frame: None
+        self.addCleanup(signal.signal, signal.SIGALRM, signal.signal(signal.SIGALRM, self.handler))
+
+    def assertRestored(self):
+        self.assertIs(signal.getsignal(signal.SIGALRM), self.handler)
+        self.assertEqual(signal.getitimer(signal.ITIMER_REAL), (0.0, 0.0))
+
+    def test_finished_job_restores_handler(self):
+        with catapillar._python_deadline(5):
+            pass
+        self.assertRestored()
+
+    def test_timeout_restores_handler(self):
+        with self.assertRaises(catapillar._JobTimeout):
+            with catapillar._python_deadline(0.05):
+                while True:
+                    pass
+        self.assertRestored()
+
+    def test_no_limit(self):
+        with catapillar._python_deadline(None):
+            self.assertIs(signal.getsignal(signal.SIGALRM), self.handler)
+        self.assertRestored()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+# tests/test_python_mapper.py
+# Python mapper on plain-dict ASTs (Node.to_dict form) as well as node objects.
+
+import os
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from mapper.python_mapper import (
+    IndentContext,
+    MapError,
+    map_expr,
+    map_flow,
+    map_program,
+    map_segment,
+    map_statement,
+)
+from parser.nodes import from_dict
+
+
+def _set_line(value):
+    return {"type": "Line", "action": "SET", "name": "x", "value": value}
+
+
+NUMBER = {"type": "NumberLiteral", "value": "1"}
+SEGMENT = {"type": "Segment", "lines": [_set_line(NUMBER)]}
+FLOW = {"type": "Flow", "segments": [SEGMENT]}
+PROGRAM = {"type": "Program", "flows": [FLOW]}
+
+
+class PlainDictInputTest(unittest.TestCase):
+    def test_expr(self):
+        expr = {"type": "BinaryExpr", "op": "+", "left": NUMBER, "right": {"type": "Identifier", "name": "y"}}
+        self.assertEqual(map_expr(expr), "(1 + y)")
+
+    def test_structure_entry_points(self):
+        self.assertEqual(map_statement(_set_line(NUMBER), IndentContext()), ["x = 1"])
+        self.assertEqual(map_segment(SEGMENT, IndentContext()), ["x = 1"])
+        self.assertEqual(map_flow(FLOW, IndentContext()), ["x = 1"])
+        self.assertEqual(map_program(PROGRAM), "x = 1")
+
+    def test_same_output_as_nodes(self):
+        self.assertEqual(map_program(from_dict(PROGRAM)), map_program(PROGRAM))
+
+    def test_unknown_expression_type(self):
+        weird = {"type": "Weird", "value": 1}
+        with self.assertRaisesRegex(MapError, "Unknown expression type: Weird"):
+            map_expr(weird)
+        with self.assertRaisesRegex(MapError, "Unknown expression type: Weird"):
+            map_program({"type": "Program", "flows": [{"type": "Flow", "segments": [
+                {"type": "Segment", "lines": [_set_line(weird)]}]}]})
+
+    def test_unknown_statement_and_structure_types(self):
+        with self.assertRaisesRegex(MapError, "Unknown statement type: Weird"):
+            map_statement({"type": "Weird"}, IndentContext())
+        with self.assertRaisesRegex(MapError, "Expected Flow node"):
+            map_flow({"type": "Weird"}, IndentContext())
+        with self.assertRaisesRegex(MapError, "Expected Segment node"):
+            map_segment({"type": "Weird"}, IndentContext())
+        with self.assertRaisesRegex(MapError, "Root node must be Program"):
+            map_program({"type": "Weird"})
+
+
+if __name__ == "__main__":
+    unittest.main()
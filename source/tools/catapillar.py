@@ -4,7 +4,15 @@
 
 import sys
 import os
+import io
+import time
+import json
+import re
+import traceback
 import warnings
+from collections import OrderedDict
+from collections.abc import Mapping
+from contextlib import contextmanager, redirect_stdout
 
 # ------------------------------------------------------------
 # 1️⃣ Ensure project root is on sys.path
@@ -13,13 +21,86 @@ ROOT = os.path.dirname(os.path.dirname(__file__))
 if ROOT not in sys.path:
     sys.path.insert(0, ROOT)
 
+# ------------------------------------------------------------
+# 1️⃣½ --startup-profile: time every import from here on
+# ------------------------------------------------------------
+class _StartupProfiler:
+    """
+    Wraps builtins.__import__ and records, for every import that loads new
+    modules, its self and cumulative time (same idea as `python -X importtime`,
+    but limited to what this CLI pulls in). The report goes to stderr at exit.
+    """
+
+    def __init__(self):
+        import builtins
+        self._builtins = builtins
+        self._real_import = builtins.__import__
+        self._stack = []  # time spent in nested imports, per open import
+        self.records = []  # (depth, name, self_s, cumulative_s), in completion order
+        self.started = time.perf_counter()
+
+    def install(self):
+        self._builtins.__import__ = self._import
+        import atexit
+        atexit.register(self.report)
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        loaded = len(sys.modules)
+        self._stack.append(0.0)
+        t0 = time.perf_counter()
+        try:
+            return self._real_import(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.perf_counter() - t0
+            nested = self._stack.pop()
+            if self._stack:
+                self._stack[-1] += elapsed
+            if len(sys.modules) != loaded:
+                # `from pkg import submodule` reports the submodule, not the package
+                subs = [f"{name}.{item}" for item in fromlist or () if f"{name}.{item}" in sys.modules]
+                label = ", ".join(subs) if subs else name
+                if level and globals:
+                    label = f"{globals.get('__package__')}.{label}" if label else globals.get("__package__")
+                self.records.append((len(self._stack), label, elapsed - nested, elapsed))
+
+    def measure(self, label, fn, *args):
+        """Time a non-import startup step (e.g. lexicon loading) into the same report."""
+        self._stack.append(0.0)
+        t0 = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            elapsed = time.perf_counter() - t0
+            nested = self._stack.pop()
+            if self._stack:
+                self._stack[-1] += elapsed
+            self.records.append((len(self._stack), label, elapsed - nested, elapsed))
+
+    def report(self):
+        out = sys.stderr
+        out.write("=== STARTUP PROFILE ===\n")
+        out.write(f"{'self [ms]':>10} | {'cumulative':>10} | module\n")
+        for depth, name, self_s, cum_s in self.records:
+            out.write(f"{self_s * 1000:10.2f} | {cum_s * 1000:10.2f} | {'  ' * depth}{name}\n")
+        top = sum(cum_s for depth, _, _, cum_s in self.records if depth == 0)
+        out.write(f"imports + lexicons: {top * 1000:.2f} ms, "
+                  f"wall clock: {(time.perf_counter() - self.started) * 1000:.2f} ms\n")
+
+
+_startup_profiler = None
+if "--startup-profile" in sys.argv:
+    sys.argv.remove("--startup-profile")
+    _startup_profiler = _StartupProfiler()
+    _startup_profiler.install()
+
 # ------------------------------------------------------------
 # 2️⃣ Configure Catapillar warning behavior
 # ------------------------------------------------------------
 from parser.errors import CatapillarWarning, CatapillarError
+from runtime import log
 
 def _show_catapillar_warning(message, category, filename, lineno, file=None, line=None):
-    print(f"[Catapillar Warning] {message}")
+    log.warning("Catapillar Warning", "%s", message)
 
 warnings.showwarning = _show_catapillar_warning
 warnings.simplefilter("always", CatapillarWarning)
@@ -29,20 +110,57 @@ warnings.simplefilter("always", CatapillarWarning)
 # ------------------------------------------------------------
 from parser.parser import parse_file
 
-# Flow pipeline
-from mapper.flow_mapper import map_program_to_flow
-from runtime.engine import run_flow
-from runtime.lexicon_loader import load_lexicon
-
 # Legacy pipeline (python codegen)
 try:
     from mapper.python_mapper import map_program as map_program_to_python
+    from mapper.python_mapper import map_program_to as write_program_python
+    from mapper.python_mapper import iter_program_lines as iter_program_python
 except Exception:
     map_program_to_python = None  # 允许你先不装 legacy mapper 也不崩
+    write_program_python = None
+    iter_program_python = None
 
-# 注册节点：API / robot
-import runtime.api_nodes
-import runtime.robot_nodes
+LEXICON_PATHS = [
+    "lexicon/default.yaml",
+    "lexicon/agent.yaml",
+    "lexicon/project_api.yaml",
+]
+
+# Flow pipeline: imported on first use (see _flow_pipeline), so python-only
+# runs never load requests, yaml, the capability modules or the lexicons.
+_flow = None
+
+
+def _flow_pipeline():
+    """Import the flow runtime and load lexicons once; returns (map_program_to_flow, run_flow)."""
+    global _flow
+    if _flow is None:
+        from mapper.flow_mapper import map_program_to_flow
+        from runtime.engine import run_flow
+        from runtime.lexicon_loader import load_lexicon
+
+        # 注册节点：API / robot
+        import runtime.api_nodes
+        import runtime.robot_nodes
+
+        for lexicon_path in LEXICON_PATHS:
+            if _startup_profiler is not None:
+                _startup_profiler.measure(f"<lexicon {lexicon_path}>", load_lexicon, lexicon_path)
+            else:
+                load_lexicon(lexicon_path)
+        _flow = (map_program_to_flow, run_flow)
+    return _flow
+
+
+ROUTINGS = ("router", "edges")
+
+
+def _flow_transitions(ast, routing: str):
+    """--routing=edges: route by the .cat arrows (compiled once) instead of the built-in Router."""
+    if routing != "edges":
+        return None
+    from mapper.flow_mapper import map_program_to_transitions
+    return map_program_to_transitions(ast)
 
 
 # ------------------------------------------------------------
@@ -53,7 +171,7 @@ def _iter_lines_from_ast(ast: dict):
     Yield all statement nodes that could be Line/Block inside:
     Program -> flows[] -> segments[] -> lines[]
     """
-    if not isinstance(ast, dict):
+    if not isinstance(ast, Mapping):
         return
     for flow in ast.get("flows", []) or []:
         for seg in flow.get("segments", []) or []:
@@ -71,7 +189,7 @@ def _ast_contains_legacy_lines(ast: dict) -> bool:
             return True
         if t == "Block":
             for inner in stmt.get("lines", []) or []:
-                if isinstance(inner, dict) and inner.get("type") == "Line":
+                if isinstance(inner, Mapping) and inner.get("type") == "Line":
                     return True
     return False
 
@@ -92,16 +210,797 @@ def _ast_summary(ast: dict) -> str:
     return f"Program: {n_flows} flow(s), {n_lines} statement(s)"
 
 
+def _choose_mode(ast, mode: str) -> str:
+    """
+    Auto strategy:
+    - If arrows exist: run flow
+    - Else if legacy lines exist: python output (this restores your "old DSL" visibility)
+    - Else: try flow mapping anyway (may be empty), but still print AST so you can debug
+    """
+    if mode != "auto":
+        return mode
+    if _ast_contains_arrows(ast):
+        return "flow"
+    if _ast_contains_legacy_lines(ast):
+        return "python"
+    return "flow"
+
+
+# Characters of generated Python collected per stdout write.
+_STDOUT_CHUNK = 1 << 16
+
+
+def _emit_python(ast, py_code, output_path):
+    """
+    Print generated Python under the === PYTHON === header, or write it to
+    output_path. Without py_code the mapper streams into a temporary file
+    that replaces output_path only once mapping succeeded. For stdout it
+    maps once without keeping the lines, then maps again straight to stdout
+    in _STDOUT_CHUNK pieces, so a MapError never leaves half a program
+    behind and the program is never held in memory as a whole.
+    """
+    if output_path:
+        tmp = f"{output_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as out:
+                if py_code is None:
+                    write_program_python(ast, out)
+                else:
+                    out.write(py_code + "\n")
+            os.replace(tmp, output_path)
+        except BaseException:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+        print(f"=== PYTHON === written to {output_path}")
+        return
+
+    if py_code is None:
+        for _ in iter_program_python(ast):
+            pass
+        print("=== PYTHON ===")
+        write = sys.stdout.write
+        chunk, size = [], 0
+        for line in iter_program_python(ast):
+            chunk.append(line)
+            size += len(line) + 1
+            if size >= _STDOUT_CHUNK:
+                write("\n".join(chunk) + "\n")
+                chunk, size = [], 0
+        if chunk:
+            write("\n".join(chunk) + "\n")
+    else:
+        print("=== PYTHON ===")
+        print(py_code)
+
+
+def _exec_namespace() -> dict:
+    """Globals for running generated Python."""
+    # Single namespace so top-level defs (e.g. 小计算器, main) are visible when main() runs
+    glb = {"__name__": "__catapillar_exec__"}
+
+    def _catapillar_index_set(name, container, index, value):
+        """Raise a clear error if index assignment target is a string (e.g. parser fallback)."""
+        if isinstance(container, str):
+            raise TypeError(
+                f"Cannot assign to index: variable {name!r} is a string. "
+                "Use a list or dict literal (e.g. 置 列表 [a | b | c] or 映[key: val])."
+            )
+        container[index] = value
+
+    glb["_catapillar_index_set"] = _catapillar_index_set
+    return glb
+
+
+def _exec_python(code):
+    """Run generated Python (source or compiled code) under the === EXEC === header."""
+    print("\n=== EXEC ===")
+    try:
+        exec(code, _exec_namespace())
+    except Exception as e:
+        print(f"[Catapillar] Error while running your .cat file: {e}")
+        print("If the traceback points to '<string>', the error is in code generated from your .cat file.")
+        raise
+
+
+# ------------------------------------------------------------
+# Serve mode: JSON-RPC 2.0 over stdio (--serve)
+# ------------------------------------------------------------
+_WARNING_LINE_RE = re.compile(r"\[line (\d+)\]")
+
+# JSON-RPC error codes
+RPC_PARSE_ERROR = -32700
+RPC_INVALID_REQUEST = -32600
+RPC_METHOD_NOT_FOUND = -32601
+RPC_INVALID_PARAMS = -32602
+RPC_INTERNAL_ERROR = -32603
+RPC_CATAPILLAR_ERROR = -32000  # tokenize / parse errors in the .cat source
+RPC_RUNTIME_ERROR = -32001  # the program itself raised while running
+
+
+class RpcError(Exception):
+    def __init__(self, code: int, message: str, data=None):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+        self.data = data
+
+
+class CatapillarServer:
+    """
+    Long-lived Catapillar process for editors and other tools.
+
+    Reads one JSON-RPC 2.0 request per line on stdin and writes one response
+    per line on stdout. Lexicons are loaded once (on the first flow run), parsed
+    ASTs stay in an AstCache and compiled Python is kept per AST, so repeated requests
+    for an unchanged file skip straight to the work that was asked for.
+
+    Every method takes {"path": "<file.cat>"} or {"source": "<text>"}:
+      parse      + "print_ast": "summary"|"full"   → {"ast", "output"}
+      transpile                                    → {"python", "output"}
+      run        + "mode", "input", "routing",     → {"mode", "python"|"flow" + "ctx", "output"}
+                   "max_visits", "max_steps", "timeout"
+      diagnose                                     → {"diagnostics": [{severity, message, line}]}
+      shutdown                                     → null, then the server exits
+
+    Anything the pipeline prints (program output, and runtime logs when
+    --log-level turns them on) is captured and returned as "output" so it
+    never corrupts the protocol stream. Programs
+    run with an empty stdin: input() raises EOFError instead of blocking.
+    """
+
+    # compiled code kept for this many distinct ASTs
+    MAX_COMPILED = 64
+
+    def __init__(self):
+        from parser.ast_cache import AstCache
+        self.ast_cache = AstCache()
+        # id(ast) -> (ast, py_code, code); the AST is kept so the id stays valid
+        self._compiled: "OrderedDict[int, tuple]" = OrderedDict()
+        self._running = True
+        self._methods = {
+            "parse": self.rpc_parse,
+            "transpile": self.rpc_transpile,
+            "run": self.rpc_run,
+            "diagnose": self.rpc_diagnose,
+            "shutdown": self.rpc_shutdown,
+        }
+
+    def serve(self, stdin, stdout) -> None:
+        for raw in stdin:
+            if not raw.strip():
+                continue
+            response = self.handle_line(raw)
+            if response is not None:
+                stdout.write(json.dumps(response, ensure_ascii=False) + "\n")
+                stdout.flush()
+            if not self._running:
+                break
+
+    def handle_line(self, raw: str):
+        """Handle one request line; returns the response dict (None for notifications)."""
+        try:
+            request = json.loads(raw)
+        except ValueError as e:
+            return _rpc_response(None, error=RpcError(RPC_PARSE_ERROR, f"Parse error: {e}"))
+
+        req_id = request.get("id") if isinstance(request, dict) else None
+        try:
+            if not isinstance(request, dict) or not isinstance(request.get("method"), str):
+                raise RpcError(RPC_INVALID_REQUEST, "Invalid request")
+            method = self._methods.get(request["method"])
+            if method is None:
+                raise RpcError(RPC_METHOD_NOT_FOUND, f"Unknown method: {request['method']}")
+            params = request.get("params") or {}
+            if not isinstance(params, dict):
+                raise RpcError(RPC_INVALID_PARAMS, "params must be an object")
+            result = method(params)
+        except RpcError as e:
+            error = e
+        except CatapillarError as e:
+            error = RpcError(RPC_CATAPILLAR_ERROR, str(e), {"line": e.lineno})
+        except OSError as e:
+            error = RpcError(RPC_INVALID_PARAMS, str(e))
+        except Exception as e:
+            # e.g. a MapError from the python mapper: answer and keep serving
+            error = RpcError(RPC_INTERNAL_ERROR, f"{type(e).__name__}: {e}", {
+                "traceback": traceback.format_exc(),
+            })
+        else:
+            return None if "id" not in request else _rpc_response(req_id, result=result)
+        if isinstance(request, dict) and "id" not in request:
+            return None
+        return _rpc_response(req_id, error=error)
+
+    # ---- methods ----
+
+    def rpc_parse(self, params: dict) -> dict:
+        with redirect_stdout(io.StringIO()) as out:
+            ast = self._load_ast(params)
+        print_ast = params.get("print_ast", "summary")
+        return {
+            "ast": ast.to_dict() if print_ast == "full" else _ast_summary(ast),
+            "output": out.getvalue(),
+        }
+
+    def rpc_transpile(self, params: dict) -> dict:
+        if map_program_to_python is None:
+            raise RpcError(RPC_CATAPILLAR_ERROR, "python_mapper not available, cannot generate python.")
+        with redirect_stdout(io.StringIO()) as out:
+            py_code, _ = self._compile(self._load_ast(params))
+        return {"python": py_code, "output": out.getvalue()}
+
+    def rpc_run(self, params: dict) -> dict:
+        mode = str(params.get("mode", "auto")).lower()
+        if mode not in ("auto", "flow", "python"):
+            raise RpcError(RPC_INVALID_PARAMS, f"Unknown mode: {mode}. Use auto|flow|python")
+        routing = params.get("routing", "router")
+        if routing not in ROUTINGS:
+            raise RpcError(RPC_INVALID_PARAMS, f"Unknown routing: {routing}. Use router|edges")
+        limits = {
+            key: params[name]
+            for name, key in (("max_visits", "visits"), ("max_steps", "max_steps"), ("timeout", "timeout"))
+            if params.get(name) is not None
+        }
+
+        out = io.StringIO()
+        with redirect_stdout(out):
+            ast = self._load_ast(params)
+            chosen = _choose_mode(ast, mode)
+            result = {"mode": chosen}
+            if chosen == "python" and map_program_to_python is None:
+                raise RpcError(RPC_CATAPILLAR_ERROR, "python_mapper not available, cannot generate python.")
+
+            stdin = sys.stdin
+            sys.stdin = io.StringIO()
+            try:
+                if chosen == "python":
+                    result["python"], code = self._compile(ast)
+                    exec(code, _exec_namespace())
+                else:
+                    map_program_to_flow, run_flow = _flow_pipeline()
+                    flow = map_program_to_flow(ast)
+                    result["flow"] = flow
+                    if flow:
+                        ctx = {}
+                        if "input" in params:
+                            ctx["input"] = params["input"]
+                        ctx = run_flow(flow, ctx, _flow_transitions(ast, routing), **limits)
+                        result["ctx"] = _json_safe(ctx)
+            except (RpcError, CatapillarError):
+                raise
+            except (Exception, SystemExit) as e:
+                # exit() in the program ends the run, not the server
+                raise RpcError(RPC_RUNTIME_ERROR, f"{type(e).__name__}: {e}", {
+                    "output": out.getvalue(),
+                    "traceback": traceback.format_exc(),
+                })
+            finally:
+                sys.stdin = stdin
+
+        result["output"] = out.getvalue()
+        return result
+
+    def rpc_diagnose(self, params: dict) -> dict:
+        """Parse fresh (bypassing the AST cache) and report errors and warnings."""
+        diagnostics = []
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always", CatapillarWarning)
+            try:
+                if "source" in params:
+                    parse_file(io.StringIO(self._source(params)))
+                else:
+                    parse_file(self._path(params))
+            except CatapillarError as e:
+                diagnostics.append({"severity": "error", "message": str(e), "line": e.lineno})
+
+        for w in caught:
+            if not issubclass(w.category, CatapillarWarning):
+                continue
+            message = str(w.message)
+            m = _WARNING_LINE_RE.search(message)
+            diagnostics.append({
+                "severity": "warning",
+                "message": message,
+                "line": int(m.group(1)) if m else None,
+            })
+        diagnostics.sort(key=lambda d: (d["line"] is None, d["line"] or 0))
+        return {"diagnostics": diagnostics}
+
+    def rpc_shutdown(self, params: dict) -> None:
+        self._running = False
+        return None
+
+    # ---- warm state ----
+
+    def _load_ast(self, params: dict):
+        if "source" in params:
+            return parse_file(io.StringIO(self._source(params)))
+        return parse_file(self._path(params), cache=self.ast_cache)
+
+    def _compile(self, ast):
+        """(py_code, code) for `ast`, reused while the AST cache returns the same object."""
+        entry = self._compiled.get(id(ast))
+        if entry is not None and entry[0] is ast:
+            self._compiled.move_to_end(id(ast))
+            return entry[1], entry[2]
+        py_code = map_program_to_python(ast)
+        code = compile(py_code, "<string>", "exec")
+        self._compiled[id(ast)] = (ast, py_code, code)
+        while len(self._compiled) > self.MAX_COMPILED:
+            self._compiled.popitem(last=False)
+        return py_code, code
+
+    @staticmethod
+    def _path(params: dict) -> str:
+        path = params.get("path")
+        if not isinstance(path, str) or not path:
+            raise RpcError(RPC_INVALID_PARAMS, 'Expected "path" or "source" in params')
+        return path
+
+    @staticmethod
+    def _source(params: dict) -> str:
+        source = params["source"]
+        if not isinstance(source, str):
+            raise RpcError(RPC_INVALID_PARAMS, '"source" must be a string')
+        return source
+
+
+def _rpc_response(req_id, result=None, error: RpcError = None) -> dict:
+    if error is None:
+        return {"jsonrpc": "2.0", "id": req_id, "result": result}
+    body = {"code": error.code, "message": error.message}
+    if error.data is not None:
+        body["data"] = error.data
+    return {"jsonrpc": "2.0", "id": req_id, "error": body}
+
+
+def serve() -> None:
+    """Run CatapillarServer on this process's stdin/stdout until EOF or shutdown."""
+    sys.stdin.reconfigure(encoding="utf-8")
+    sys.stdout.reconfigure(encoding="utf-8")
+    CatapillarServer().serve(sys.stdin, sys.stdout)
+
+
+# ------------------------------------------------------------
+# Batch mode: many programs / inputs on a process pool
+# ------------------------------------------------------------
+# Set in every worker by _batch_init (inherited as-is on fork):
+#   path -> (mode, flow, transitions, py_code), run_flow limits
+_batch_programs = {}
+_batch_limits = {}
+# path -> compiled code; code objects do not pickle, so each worker compiles once
+_batch_code = {}
+
+
+def _batch_paths(targets):
+    """Expand directories (all .cat files below them) and glob patterns into .cat paths."""
+    import glob
+    paths = []
+    for target in targets:
+        if os.path.isdir(target):
+            paths.extend(sorted(glob.glob(os.path.join(target, "**", "*.cat"), recursive=True)))
+        elif glob.has_magic(target):
+            paths.extend(sorted(glob.glob(target, recursive=True)))
+        else:
+            paths.append(target)
+    return list(dict.fromkeys(paths))
+
+
+def _batch_contexts(source):
+    """
+    Yield (line number, ctx) for each record of a JSONL stream ("-" = stdin).
+    An object becomes the initial ctx, any other value becomes {"input": value};
+    an unreadable line yields (line number, ValueError).
+    """
+    if source == "-":
+        sys.stdin.reconfigure(encoding="utf-8")
+    f = sys.stdin if source == "-" else open(source, "r", encoding="utf-8")
+    try:
+        for lineno, raw in enumerate(f, 1):
+            if not raw.strip():
+                continue
+            try:
+                value = json.loads(raw)
+            except ValueError as e:
+                yield lineno, e
+                continue
+            yield lineno, value if isinstance(value, dict) else {"input": value}
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def _compile_program(ast, chosen: str, routing: str):
+    """(mode, flow, transitions, py_code) for one parsed program, as the workers take it."""
+    if chosen == "python":
+        if map_program_to_python is None:
+            raise CatapillarError("python_mapper not available, cannot generate python.")
+        return chosen, None, None, map_program_to_python(ast)
+    map_program_to_flow, _ = _flow_pipeline()
+    return chosen, map_program_to_flow(ast), _flow_transitions(ast, routing), None
+
+
+def _batch_compile(paths, mode, routing):
+    """
+    Parse and compile every program once in the parent. Returns
+    (programs, errors); programs is what the workers receive.
+    """
+    programs, errors = {}, {}
+    for path in paths:
+        try:
+            ast = parse_file(path)
+            programs[path] = _compile_program(ast, _choose_mode(ast, mode), routing)
+        except Exception as e:
+            # parse, read and mapper errors (e.g. MapError) fail this program only
+            where = f" [line {e.lineno}]" if isinstance(e, CatapillarError) and e.lineno is not None else ""
+            errors[path] = f"{type(e).__name__}: {e}{where}"
+    return programs, errors
+
+
+def _batch_init(programs, limits, log_settings=None):
+    global _batch_programs, _batch_limits
+    _batch_programs = programs
+    _batch_limits = limits
+    if log_settings is not None:
+        log.configure(**log_settings)
+    if any(program[0] == "flow" for program in programs.values()):
+        _flow_pipeline()
+
+
+class _JobTimeout(BaseException):
+    """Raised into a python-mode job at its --timeout (a BaseException, so `except Exception` in the program can't swallow it)."""
+
+
+def _raise_job_timeout(signum, frame):
+    raise _JobTimeout()
+
+
+@contextmanager
+def _python_deadline(seconds):
+    """
+    Stop the python-mode job run in the block after `seconds` (None: no limit)
+    with SIGALRM; the timer is disarmed and the previous handler restored on
+    the way out. Where that is not possible (no SIGALRM, or not on the main
+    thread) the job runs unbounded.
+    """
+    import signal
+    import threading
+    if (
+        seconds is None or not hasattr(signal, "setitimer")
+        or threading.current_thread() is not threading.main_thread()
+    ):
+        yield
+        return
+    previous = signal.signal(signal.SIGALRM, _raise_job_timeout)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        try:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+        finally:
+            # None: the old handler was not installed from Python
+            signal.signal(signal.SIGALRM, signal.SIG_DFL if previous is None else previous)
+
+
+def _json_safe(value):
+    """`value` as plain JSON data; anything JSON can't hold becomes its repr()."""
+    return json.loads(json.dumps(value, ensure_ascii=False, default=repr))
+
+
+def _batch_job(job):
+    """Run one (path, line number, ctx) job in a worker; never raises."""
+    path, lineno, ctx = job
+    chosen, flow, transitions, py_code = _batch_programs[path]
+    record = {"path": path, "line": lineno, "mode": chosen, "ok": True}
+    out = io.StringIO()
+    stdin = sys.stdin
+    # input() reads ctx["input"] (a string, or a list of lines) instead of blocking
+    lines = ctx.get("input", "")
+    sys.stdin = io.StringIO("\n".join(map(str, lines)) if isinstance(lines, list) else str(lines))
+    timeout = _batch_limits.get("timeout")
+    start = time.perf_counter()
+    try:
+        with redirect_stdout(out):
+            if chosen == "python":
+                code = _batch_code.get(path)
+                if code is None:
+                    code = _batch_code[path] = compile(py_code, "<string>", "exec")
+                with _python_deadline(timeout):
+                    exec(code, _exec_namespace())
+            elif flow:
+                _, run_flow = _flow_pipeline()
+                # ctx is sent back to the parent: keep only JSON data (e.g. no ResponseStream)
+                record["ctx"] = _json_safe(run_flow(flow, dict(ctx), transitions, **_batch_limits))
+    except _JobTimeout:
+        record["ok"] = False
+        record["error"] = f"Timeout: stopped after {timeout}s"
+    except (Exception, SystemExit) as e:
+        record["ok"] = False
+        record["error"] = f"{type(e).__name__}: {e}"
+    finally:
+        sys.stdin = stdin
+    record["seconds"] = round(time.perf_counter() - start, 6)
+    record["output"] = out.getvalue()
+    return record
+
+
+def _batch_chunk(jobs):
+    return [_batch_job(job) for job in jobs]
+
+
+def _run_jobs(jobs, programs, limits, workers=1, chunksize=1):
+    """
+    Yield one record per item of `jobs`, in order. Items are (path, line, ctx)
+    jobs, or finished records (dicts) that are passed through in place.
+    With workers > 1, jobs run on a process pool, `chunksize` per task, with
+    a bounded number of tasks in flight, so `jobs` may be an endless stream.
+    """
+    if workers <= 1:
+        _batch_init(programs, limits)
+        for job in jobs:
+            yield job if isinstance(job, dict) else _batch_job(job)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+    from collections import deque
+    from itertools import chain
+
+    in_flight = workers * 2
+    pending = deque()  # futures and finished [record] lists, in input order
+    chunk = []
+    with ProcessPoolExecutor(workers, initializer=_batch_init,
+                             initargs=(programs, limits, log.settings())) as pool:
+        for job in chain(jobs, [None]):
+            if isinstance(job, tuple):
+                chunk.append(job)
+                if len(chunk) < chunksize:
+                    continue
+            if chunk:
+                pending.append(pool.submit(_batch_chunk, chunk))
+                chunk = []
+            if isinstance(job, dict):
+                pending.append([job])
+            while pending and (job is None or len(pending) > in_flight):
+                done = pending.popleft()
+                yield from (done if isinstance(done, list) else done.result())
+
+
+def _write_records(records, out) -> tuple:
+    """Write records as JSON lines (flushed per line); returns (n_ok, n_failed)."""
+    n_ok = n_failed = 0
+    for record in records:
+        out.write(json.dumps(record, ensure_ascii=False, default=repr) + "\n")
+        out.flush()
+        if record["ok"]:
+            n_ok += 1
+        else:
+            n_failed += 1
+    return n_ok, n_failed
+
+
+def _context_jobs(paths, contexts):
+    """(path, line, ctx) for every program and context; unreadable lines become error records."""
+    for lineno, ctx in contexts:
+        if isinstance(ctx, Exception):
+            yield {"path": None, "line": lineno, "ok": False, "error": f"Invalid JSON: {ctx}"}
+            continue
+        for path in paths:
+            yield path, lineno, ctx
+
+
+def batch_command(args) -> None:
+    """
+    `batch <dir|glob|file.cat ...> [--inputs=<file.jsonl|->] [--workers=N] [--chunksize=N]
+    [--mode=...] [--routing=...] [--max-visits=N] [--max-steps=N] [--timeout=<s>] [--output=<file.jsonl>]`
+
+    Runs every program once per input context (once with {} without --inputs)
+    on a process pool and writes one JSON result per job, in job order:
+    {"path", "line", "mode", "ok", "ctx" (flow) | "error", "seconds", "output"}.
+    Programs are parsed and compiled once in the parent and handed to each
+    worker when it starts, so jobs only carry (path, line, ctx). Inputs are
+    read as a stream and results are written as they complete.
+    A summary goes to stderr; the exit status is 1 if any job failed.
+    --timeout also stops python-mode jobs (where SIGALRM exists, i.e. not on
+    Windows); --max-visits / --max-steps only bound flows.
+    Runtime logging is off unless --log-level / --log-json ask for it.
+    """
+    targets = []
+    inputs = None
+    workers = os.cpu_count() or 1
+    chunksize = 1
+    mode = "auto"
+    routing = "router"
+    limits = {}
+    output_path = None
+    for arg in args:
+        if arg.startswith("--inputs="):
+            inputs = arg.split("=", 1)[1].strip()
+        elif arg.startswith("--workers="):
+            workers = max(1, int(arg.split("=", 1)[1]))
+        elif arg.startswith("--chunksize="):
+            chunksize = max(1, int(arg.split("=", 1)[1]))
+        elif arg.startswith("--mode="):
+            mode = arg.split("=", 1)[1].strip().lower()
+        elif arg.startswith("--routing="):
+            routing = arg.split("=", 1)[1].strip().lower()
+        elif arg.startswith("--max-visits="):
+            limits["visits"] = int(arg.split("=", 1)[1])
+        elif arg.startswith("--max-steps="):
+            limits["max_steps"] = int(arg.split("=", 1)[1])
+        elif arg.startswith("--timeout="):
+            limits["timeout"] = float(arg.split("=", 1)[1])
+        elif arg.startswith("--output="):
+            output_path = arg.split("=", 1)[1].strip()
+        elif not arg.startswith("--"):
+            targets.append(arg)
+
+    _configure_log(args, quiet=True)
+    if not targets:
+        print("Usage: python tools/catapillar.py batch <dir|glob|file.cat ...> [--inputs=<file.jsonl|->] [--workers=N] [--chunksize=N] [--mode=auto|flow|python] [--routing=router|edges] [--max-visits=N] [--max-steps=N] [--timeout=<seconds>] [--output=<file.jsonl>]")
+        print("  --timeout also stops python-mode jobs (not on Windows); --max-visits / --max-steps only bound flows.")
+        sys.exit(1)
+    if mode not in ("auto", "flow", "python"):
+        print(f"[Catapillar Error] Unknown mode: {mode}. Use --mode=auto|flow|python")
+        sys.exit(1)
+    if routing not in ROUTINGS:
+        print(f"[Catapillar Error] Unknown routing: {routing}. Use --routing=router|edges")
+        sys.exit(1)
+
+    from itertools import chain
+
+    start = time.perf_counter()
+    # parse warnings and lexicon loading must not end up in the result stream
+    with redirect_stdout(sys.stderr):
+        programs, errors = _batch_compile(_batch_paths(targets), mode, routing)
+
+    if inputs is None:
+        contexts = [(None, {})]
+        workers = min(workers, len(programs)) or 1
+    else:
+        contexts = _batch_contexts(inputs)
+    jobs = chain(
+        ({"path": path, "line": None, "ok": False, "error": error} for path, error in errors.items()),
+        _context_jobs(list(programs), contexts),
+    )
+
+    out = open(output_path, "w", encoding="utf-8") if output_path else sys.stdout
+    try:
+        n_ok, n_failed = _write_records(_run_jobs(jobs, programs, limits, workers, chunksize), out)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    elapsed = time.perf_counter() - start
+    print(
+        f"[batch] {n_ok + n_failed} result(s): {n_ok} ok, {n_failed} failed "
+        f"in {elapsed:.2f}s ({workers} worker(s))",
+        file=sys.stderr,
+    )
+    if n_failed:
+        sys.exit(1)
+
+
+def _run_jsonl(path, ast, chosen, routing, limits, input_jsonl, output_jsonl, workers) -> None:
+    """
+    --input-jsonl / --output-jsonl: compile the program once, run it once per
+    input record (same record forms as `batch --inputs`) and write one result
+    record per input, in input order, as soon as it is ready. Failures are
+    reported in their records; they do not stop the stream.
+    """
+    try:
+        with redirect_stdout(sys.stderr):
+            programs = {path: _compile_program(ast, chosen, routing)}
+    except CatapillarError:
+        raise
+    except Exception as e:
+        # e.g. MapError: fail like any other unusable program, before reading input
+        print(f"[Catapillar Error] {type(e).__name__}: {e}", file=sys.stderr)
+        sys.exit(1)
+    jobs = _context_jobs([path], _batch_contexts(input_jsonl or "-"))
+    if output_jsonl in (None, "-"):
+        sys.stdout.reconfigure(encoding="utf-8")
+        out = sys.stdout
+    else:
+        out = open(output_jsonl, "w", encoding="utf-8")
+    try:
+        _write_records(_run_jobs(jobs, programs, limits, workers), out)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+# ------------------------------------------------------------
+# lexicon compile
+# ------------------------------------------------------------
+def lexicon_command(args) -> None:
+    """
+    `lexicon compile [file.yaml ...]`: precompile YAML lexicons (default:
+    lexicon/*.yaml) so load_lexicon can skip YAML parsing.
+    `lexicon conflicts [file.yaml ...]`: list aliases claimed by more than one
+    lexicon and which one wins (later files win).
+    """
+    if not args or args[0] not in ("compile", "conflicts"):
+        print("Usage: python tools/catapillar.py lexicon compile|conflicts [lexicon/*.yaml ...]")
+        sys.exit(1)
+
+    from runtime.lexicon_loader import LexiconRegistry, compile_lexicon
+
+    paths = args[1:]
+    if not paths:
+        import glob
+        paths = sorted(glob.glob(os.path.join("lexicon", "*.yaml")))
+
+    if args[0] == "conflicts":
+        registry = LexiconRegistry()
+        for lexicon_path in paths:
+            registry.load(lexicon_path)
+        print(registry.conflict_report())
+        return
+
+    for lexicon_path in paths:
+        target, n_aliases = compile_lexicon(lexicon_path)
+        print(f"{lexicon_path} → {target} ({n_aliases} aliases)")
+
+
+def _configure_log(args, quiet: bool) -> None:
+    """
+    Apply --log-level=<debug|info|warning|error|off> and --log-json[=<file>]
+    (JSON lines on stderr, or appended to <file>). With `quiet` (batch, serve
+    and JSONL modes) logging is off unless one of them is given.
+    """
+    level = None
+    json_target = None
+    for arg in args:
+        if arg.startswith("--log-level="):
+            level = arg.split("=", 1)[1].strip().lower()
+        elif arg.startswith("--log-json"):
+            json_target = arg.partition("=")[2].strip() or "-"
+    if quiet and level is None and json_target is None:
+        level = "off"
+    try:
+        log.configure(level=level, json_format=json_target)
+    except (ValueError, OSError) as e:
+        print(f"[Catapillar Error] {e}")
+        sys.exit(1)
+
+
 def main():
     if len(sys.argv) < 2:
-        print("Usage: python tools/catapillar.py <file.cat> [--mode auto|flow|python] [--exec] [--print-ast=off|summary|full]")
+        print("Usage: python tools/catapillar.py <file.cat|-> [--mode auto|flow|python] [--exec] [--print-ast=off|summary|full] [--output=<file.py>] [--no-cache] [--ast-cache=<dir>] [--routing=router|edges] [--max-visits=N] [--max-steps=N] [--timeout=<seconds>] [--input-jsonl[=<file>]] [--output-jsonl[=<file>]] [--workers=N] [--log-level=<level>] [--log-json[=<file>]] [--startup-profile]")
+        print("       --exec keeps generated and compiled code in __catcache__/ next to the file (--no-cache skips it; not written while PYTHONDONTWRITEBYTECODE is set)")
+        print("       python tools/catapillar.py --serve [--log-level=<level>] [--log-json[=<file>]]   (JSON-RPC over stdio)")
+        print("       python tools/catapillar.py batch <dir|glob|file.cat ...> [--inputs=<file.jsonl|->] [--workers=N] [--chunksize=N]")
+        print("       python tools/catapillar.py lexicon compile|conflicts [lexicon/*.yaml ...]")
         sys.exit(1)
 
+    if sys.argv[1] == "--serve":
+        _configure_log(sys.argv[2:], quiet=True)
+        serve()
+        return
+    if sys.argv[1] == "lexicon":
+        lexicon_command(sys.argv[2:])
+        return
+    if sys.argv[1] == "batch":
+        batch_command(sys.argv[2:])
+        return
+
     # --- args
     path = sys.argv[1]
     mode = "auto"
     do_exec = False
     print_ast = "off"  # off | summary | full
+    output_path = None  # python mode: write generated code here instead of stdout
+    use_cache = True  # --exec: reuse __catcache__ entries for unchanged files
+    ast_cache = None  # --ast-cache=<dir>: share parsed ASTs across runs
+    routing = "router"  # flow mode: router | edges (follow the .cat arrows)
+    flow_limits = {}  # flow mode: run_flow visits / max_steps / timeout
+    input_jsonl = None  # --input-jsonl[=<file>]: one run per JSONL record ("-" = stdin)
+    output_jsonl = None  # --output-jsonl[=<file>]: one result record per input ("-" = stdout)
+    workers = 1  # JSONL mode: process pool size
 
     for arg in sys.argv[2:]:
         if arg.startswith("--mode="):
@@ -110,35 +1009,85 @@ def main():
             print_ast = arg.split("=", 1)[1].strip().lower()
         elif arg == "--exec":
             do_exec = True
+        elif arg.startswith("--output="):
+            output_path = arg.split("=", 1)[1].strip()
+        elif arg == "--no-cache":
+            use_cache = False
+        elif arg.startswith("--max-visits="):
+            flow_limits["visits"] = int(arg.split("=", 1)[1])
+        elif arg.startswith("--max-steps="):
+            flow_limits["max_steps"] = int(arg.split("=", 1)[1])
+        elif arg.startswith("--timeout="):
+            flow_limits["timeout"] = float(arg.split("=", 1)[1])
+        elif arg.startswith("--routing="):
+            routing = arg.split("=", 1)[1].strip().lower()
+        elif arg.startswith("--input-jsonl"):
+            input_jsonl = arg.partition("=")[2].strip() or "-"
+        elif arg.startswith("--output-jsonl"):
+            output_jsonl = arg.partition("=")[2].strip() or "-"
+        elif arg.startswith("--workers="):
+            workers = max(1, int(arg.split("=", 1)[1]))
+        elif arg.startswith("--ast-cache="):
+            from parser.ast_cache import AstCache
+            ast_cache = AstCache(disk_dir=arg.split("=", 1)[1].strip())
 
-    # ✅ Load lexicons (keep your current behavior)
-    load_lexicon("lexicon/default.yaml")
-    load_lexicon("lexicon/agent.yaml")
-    load_lexicon("lexicon/project_api.yaml")
+    # --exec fast path: an unchanged file reuses its generated + compiled code
+    # and skips lexicons, tokenize, parse and map entirely.
+    jsonl = input_jsonl is not None or output_jsonl is not None
+    _configure_log(sys.argv[2:], quiet=jsonl)
+    if jsonl and path == "-" and input_jsonl in (None, "-"):
+        print("[Catapillar Error] --input-jsonl reads stdin; pass the program as a file or use --input-jsonl=<file>")
+        sys.exit(1)
 
-    # Step 1: Parse .cat file into AST
-    ast = parse_file(path)
+    cache_key = None
+    if (
+        not jsonl and do_exec and use_cache and map_program_to_python is not None
+        and path != "-" and print_ast == "off" and mode in ("auto", "python")
+    ):
+        from mapper import code_cache
+        with open(path, "rb") as f:
+            cache_key = code_cache.source_key(f.read(), mode, LEXICON_PATHS)
+        cached = code_cache.load(path, cache_key)
+        if cached is not None:
+            py_code, code, parse_warnings = cached
+            for message in parse_warnings:
+                warnings.warn(message, CatapillarWarning)
+            _emit_python(None, py_code, output_path)
+            _exec_python(code)
+            return
 
-    # Decide mode
-    has_legacy = _ast_contains_legacy_lines(ast)
-    has_arrows = _ast_contains_arrows(ast)
+    # Step 1: Parse .cat file into AST ("-" streams the source from stdin)
+    # (JSONL mode keeps stdout for records: parse warnings go to stderr;
+    # they are recorded too, so a code cache entry can replay them)
+    parse_warnings = []
+    with redirect_stdout(sys.stderr if jsonl else sys.stdout):
+        try:
+            with warnings.catch_warnings(record=True) as caught:
+                warnings.simplefilter("always", CatapillarWarning)
+                if path == "-":
+                    sys.stdin.reconfigure(encoding="utf-8")
+                    ast = parse_file(sys.stdin)
+                else:
+                    ast = parse_file(path, cache=ast_cache)
+        finally:
+            for w in caught:
+                warnings.showwarning(w.message, w.category, w.filename, w.lineno)
+                if issubclass(w.category, CatapillarWarning):
+                    parse_warnings.append(str(w.message))
 
-    # Auto strategy:
-    # - If legacy lines exist: prefer python output (this restores your "old DSL" visibility)
-    # - Else if arrows exist: run flow
-    # - Else: try flow mapping anyway (may be empty), but still print AST so you can debug
+    # Decide mode
     if mode not in ("auto", "flow", "python"):
         print(f"[Catapillar Error] Unknown mode: {mode}. Use --mode=auto|flow|python")
         sys.exit(1)
+    if routing not in ROUTINGS:
+        print(f"[Catapillar Error] Unknown routing: {routing}. Use --routing=router|edges")
+        sys.exit(1)
 
-    chosen = mode
-    if mode == "auto":
-        if has_arrows:
-            chosen = "flow"
-        elif has_legacy:
-            chosen = "python"
-        else:
-            chosen = "flow"
+    chosen = _choose_mode(ast, mode)
+
+    if jsonl:
+        _run_jsonl(path, ast, chosen, routing, flow_limits, input_jsonl, output_jsonl, workers)
+        return
 
     # Step 2: Run selected pipeline
     if chosen == "python":
@@ -146,66 +1095,50 @@ def main():
             print("[Catapillar Error] python_mapper not available, cannot generate python.")
             if print_ast != "off":
                 print("\n=== AST ===")
-                print(ast if print_ast == "full" else _ast_summary(ast))
+                print(ast.to_dict() if print_ast == "full" else _ast_summary(ast))
             return
 
-        py_code = map_program_to_python(ast)
-
-        print("=== PYTHON ===")
-        print(py_code)
+        # --exec needs the source string anyway; otherwise stream it out
+        py_code = map_program_to_python(ast) if do_exec else None
+        _emit_python(ast, py_code, output_path)
 
         if do_exec:
-            print("\n=== EXEC ===")
-            # Single namespace so top-level defs (e.g. 小计算器, main) are visible when main() runs
-            glb = {"__name__": "__catapillar_exec__"}
-
-            def _catapillar_index_set(name, container, index, value):
-                """Raise a clear error if index assignment target is a string (e.g. parser fallback)."""
-                if isinstance(container, str):
-                    raise TypeError(
-                        f"Cannot assign to index: variable {name!r} is a string. "
-                        "Use a list or dict literal (e.g. 置 列表 [a | b | c] or 映[key: val])."
-                    )
-                container[index] = value
-
-            glb["_catapillar_index_set"] = _catapillar_index_set
-            try:
-                exec(py_code, glb)
-            except Exception as e:
-                print(f"[Catapillar] Error while running your .cat file: {e}")
-                print("If the traceback points to '<string>', the error is in code generated from your .cat file.")
-                raise
+            code = compile(py_code, "<string>", "exec")
+            if cache_key is not None:
+                code_cache.store(path, cache_key, py_code, code, parse_warnings)
+            _exec_python(code)
 
         if print_ast != "off":
             print("\n=== AST ===")
-            print(ast if print_ast == "full" else _ast_summary(ast))
+            print(ast.to_dict() if print_ast == "full" else _ast_summary(ast))
         return
 
-    # chosen == "flow"
+    # chosen == "flow" (lexicons are loaded here, only when the flow pipeline runs)
+    map_program_to_flow, run_flow = _flow_pipeline()
     flow = map_program_to_flow(ast)
 
-    print("=== FLOW ===")
-    print(flow)
+    log.info(None, "=== FLOW ===\n%s", flow)
 
     if not flow:
-        print("No executable flow generated.")
+        log.info(None, "No executable flow generated.")
         if print_ast != "off":
             print("\n=== AST ===")
-            print(ast if print_ast == "full" else _ast_summary(ast))
+            print(ast.to_dict() if print_ast == "full" else _ast_summary(ast))
         return
 
     # Step 3: Execute runtime
     ctx = {}
-    run_flow(flow, ctx)
+    run_flow(flow, ctx, _flow_transitions(ast, routing), **flow_limits)
 
     if print_ast != "off":
         print("\n=== AST ===")
-        print(ast if print_ast == "full" else _ast_summary(ast))
+        print(ast.to_dict() if print_ast == "full" else _ast_summary(ast))
 
 
 if __name__ == "__main__":
     try:
         main()
     except CatapillarError as e:
-        print(f"[Catapillar Error] {e}")
+        where = f" [line {e.lineno}]" if e.lineno is not None else ""
+        print(f"[Catapillar Error] {e}{where}")
         sys.exit(1)